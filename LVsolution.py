@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:58:39 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+"""
+
+import numpy as np
+import solutionPlot
+
+
+def time_window(t, t_min, t_max):
+    """
+    Returns the extremes (first, last) of the slice of the sorted grid t 
+    inside [t_min, t_max]. If t_min or t_max is None, the window is open
+    on that side.
+    """
+
+    first = 0 if t_min is None else int(np.searchsorted(t, t_min, 'left'))
+    last = len(t) if t_max is None else int(np.searchsorted(t, t_max, 'right'))
+
+    return first, last
+
+
+def merge_events(old, t0, new):
+    """
+    Returns the events of a solution continued from time t0: the events of
+    the old solution before t0, followed by the new ones. Only the first 
+    event of each kind (of each species, for the extinctions) is kept.
+    """
+
+    events = {}
+    for kind, value in old.items():
+        if (kind == 'extinction'):
+            before = {name: time for name, time in value.items() if time < t0}
+            if before:
+                events[kind] = before
+        elif (value < t0):
+            events[kind] = value
+
+    for kind, value in (new or {}).items():
+        if (kind == 'extinction'):
+            merged = dict(value)
+            merged.update(events.get(kind, {}))
+            events[kind] = merged
+        elif not (kind in events):
+            events[kind] = value
+
+    return events
+
+
+class Solution:
+    """
+    Solution(t, y, species)
+
+    This class holds the solution of the system in memory.
+
+    Attributes
+    ----------
+    t: array (T,)
+        Time grid.
+    y: array (T,N)
+        Contiguous float64 array with the populations. y[i][j] is the
+        population of the j-th species at time t[i].
+    species: list
+        Species' names, in the order of the columns of y.
+    events: dict
+        Events found during the integration, as returned by 
+        Ecosystem.solve: {'extinction': {name: time}, 
+        'steady_state': time, 'blow_up': time}. Empty if no event has
+        been looked for or found.
+    stats: SolveStats
+        Time of each stage and counters of the solver, set by 
+        Ecosystem.solve. None otherwise.
+
+    Methods
+    -------
+    final_state()
+    select(species=None, t_min=None, t_max=None)
+    plot(path=None, **options)
+    to_dataframe()
+    to_csv(path)
+    from_csv(path, t=None)
+
+    A single species' population is returned by solution[name].
+
+    """
+
+    def __init__(self, t, y, species, events=None):
+
+        self.t = np.ascontiguousarray(t, dtype=float)
+        self.y = np.ascontiguousarray(y, dtype=float)
+        self.species = list(species)
+        self.events = {} if events is None else events
+        self.stats = None
+
+        if not (self.y.shape == (len(self.t), len(self.species))):
+            raise ValueError("The solution must have shape (len(t), len(species)).")
+
+    @property
+    def shape(self):
+        return self.y.shape
+
+    def __array__(self, dtype=None, copy=None):
+
+        if dtype is None:
+            return self.y
+
+        return self.y.astype(dtype)
+
+    def __len__(self):
+        return len(self.t)
+
+    def __getitem__(self, name):
+        """
+        Returns the population of the species 'name' at each time.
+        """
+
+        if not (name in self.species):
+            raise KeyError("Species not found: "+str(name)+".")
+
+        return self.y[:, self.species.index(name)]
+
+    def final_state(self):
+        """
+        Returns the dictionary {name: population} at the last time.
+        """
+
+        return dict(zip(self.species, self.y[-1].tolist()))
+
+    def select(self, species=None, t_min=None, t_max=None):
+        """
+        Returns a new Solution restricted to some species and to a time 
+        window. If the populations are memory-mapped, only the selected
+        part is read.
+
+        Parameters
+        ----------
+        species: list
+            Names of the species. All if not given.
+        t_min, t_max: float
+            Time window, extremes included. The whole grid if not given.
+
+        """
+
+        first, last = time_window(self.t, t_min, t_max)
+        y = self.y[first:last]
+
+        if species is None:
+            species = self.species
+        else:
+            y = y[:, [self.species.index(name) for name in species]]
+
+        return Solution(self.t[first:last], y, species, self.events)
+
+    def plot(self, path=None, **options):
+        """
+        Plots the population of each species against time. Long series 
+        are decimated and all the species are drawn as a single line 
+        collection, see solutionPlot.plot_solution for the options (top-k
+        species, decimation method, ...).
+        If path is given, the figure is rendered without display and saved
+        into that file.
+
+        Returns
+        -------
+        The tuple (fig, ax).
+
+        """
+
+        return solutionPlot.plot_solution(self, path=path, **options)
+
+    def to_dataframe(self):
+        """
+        Returns a pandas DataFrame with a column for each species, in the
+        same format of the file 'solution.csv'.
+        """
+
+        import pandas as pd
+
+        return pd.DataFrame(self.y, columns=self.species)
+
+    def to_csv(self, path):
+        """
+        Writes the solution in the file 'path', in the same format of the
+        file 'solution.csv'.
+        """
+
+        self.to_dataframe().to_csv(path, index=True, header=True)
+
+    @classmethod
+    def from_csv(cls, path, t=None):
+        """
+        Reads a solution written in the format of the file 'solution.csv'.
+
+        Parameters
+        ----------
+        path: string
+        t: array
+            Time grid of the solution, since the file does not store it.
+            If not given, the index of the rows is used.
+
+        """
+
+        import pandas as pd
+
+        data = pd.read_csv(path, index_col=0)
+
+        if t is None:
+            t = data.index.values
+
+        return cls(t, data.values, data.columns)
@@ -7,50 +7,103 @@ Created on Sat Sep 26 09:52:55 2020
 GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
 """
 
-from numpy import zeros
+from numpy import (linspace, array, broadcast_to, arange, concatenate, isnan,
+                   argwhere, triu, swapaxes, diff, inf)
 import systemDynamicGenerator
+import glvEngine
+import jitEngine
+import integrationMethods
+import parallelScan
+import equilibriumAnalysis
+import sensitivityAnalysis
+import parameterFitting
+import binaryStorage
+import resultCache
+from LVsolution import Solution, merge_events
+from solveStats import SolveStats
+from speciesRegistry import SpeciesRegistry, AssembledSystem
 import sysFunctions
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import copy
+import warnings
 from datetime import datetime
-import shutil
 
 class Ecosystem:
     """
     Ecosystem()
     
     This class is used to store and manage the information about the
-    system. 
+    system. Each instance holds its own species, parameters and solution,
+    so that many independent systems can live in the same process.
     
     Methods
     -------
     addSpecies(name)
+    add_species_many(names, initial_conds=None, growth_rates=None,
+                     carr_caps=None, change_rates=None)
     removeSpecies(name)
+    set_interactions_from_array(A, names=None)
     setInteraction(name1, name2, value)
     setInitialCond(name, value)
     setGrowthRate(name, value)
     setCarrCap(name, value)
     setChangeRate(name, value)
     status(name = '')
-    solve(max_time=20, t_steps=129)
+    solve(max_time=20, t_steps=129, backend='numpy', jacobian=True, 
+          sparse=None)
+    solve_ensemble(max_time=20, t_steps=129, initial_conds=None, 
+                   growth_rates=None, carr_caps=None, change_rates=None,
+                   interactions=None, jacobian=True)
+    scan(points, max_time=20, t_steps=129, processes=None, jacobian=True)
     plot()
-    saveSetup(name = '')
-    saveSolution(name = '')
+    saveSetup(name = '', format='binary')
+    saveSolution(name = '', format='binary')
     loadSetup(name)
+    loadSolution(name, mmap=True)
     
     Further information are given by the documentation of each method.
     
     """
     
-    species_list = []
+    __slots__ = ('registry', 'solution')
     
-    intMatrix = {}
-  
-    InitialCond = {}
-    GrowthRate = {}
-    CarrCap = {}
-    ChangeRate = {}
+    def __init__(self):
+        
+        # Name -> slot registry holding species, parameters and interactions.
+        self.registry = SpeciesRegistry()
+        
+        # Solution object of the last integration.
+        self.solution = None
+    
+    @property
+    def species_list(self):
+        """List of the species' names, in the order they were added."""
+        return self.registry.species()
+    
+    @property
+    def intMatrix(self):
+        """Dictionary {(name1, name2): value} of the interactions set."""
+        return self.registry.interactions()
+    
+    @property
+    def InitialCond(self):
+        """Dictionary {name: initial condition}."""
+        return self.registry.parameter_dict('InitialCond')
+    
+    @property
+    def GrowthRate(self):
+        """Dictionary {name: growth rate}."""
+        return self.registry.parameter_dict('GrowthRate')
+    
+    @property
+    def CarrCap(self):
+        """Dictionary {name: carrying capacity}."""
+        return self.registry.parameter_dict('CarrCap')
+    
+    @property
+    def ChangeRate(self):
+        """Dictionary {name: change rate}."""
+        return self.registry.parameter_dict('ChangeRate')
   
     def create_data(self):
         """
@@ -71,94 +124,136 @@ class Ecosystem:
         species' name.
         """
         
-        N = len(self.species_list)
-
-        n0 = []
-        k = []
-        K = []
-        c = []
-        for key in self.species_list:
-            n0.append(self.InitialCond[key])
-            k.append(self.GrowthRate[key])
-            K.append(self.CarrCap[key])
-            c.append(self.ChangeRate[key])
+        names, n0, k, K, c, A = self.system_arrays(sparse=False)
+        
+        return (len(names), list(names), n0.tolist(), k.tolist(), K.tolist(), 
+                c.tolist(), A.copy())
+        
+    
+    def system_arrays(self, sparse=False):
+        """
+        Organizes the data as NumPy arrays, ready for the integration.
+        The arrays are assembled once and cached: the setters update them
+        in place, while adding or removing species makes them rebuilt at 
+        the next call. Thus they must not be modified by the caller.
+        
+        sparse: bool or None
+            If True the interaction matrix is returned as a SciPy CSR 
+            matrix, if False as a dense array. If None the choice is made 
+            from the number of species and of interactions.
+        
+        Returns
+        -------
+        The tuple (names, n0, k, K, c, A), with the same meaning of 
+        create_data.
+        
+        """
+        
+        if self.registry.assembled is None:
+            self.check_parameters()
+            
+            slots = self.registry.slots()
+            names = [self.registry.names[s] for s in slots]
+            params = self.registry.params[:, slots]
+            
+            A = self.sparse_matrix(*params[1:])
+            
+            self.registry.assembled = AssembledSystem(slots, names, params, A)
         
-        A = self.dict_into_matrix(k, K, c)
+        system = self.registry.assembled
         
-        return (N, self.species_list, n0, k, K, c, A)
+        if sparse is None:
+            sparse = glvEngine.use_sparse(system.A)
+        A = system.A if sparse else system.dense()
+        
+        return (system.names, system.n0, system.k, system.K, system.c, A)
         
     
+    def check_parameters(self):
+        """
+        Raises KeyError if any parameter of any species is missing.
+        
+        """
+        
+        slots = self.registry.slots()
+        missing = isnan(self.registry.params[:, slots])
+        
+        if missing.any():
+            which, i = argwhere(missing)[0]
+            key = self.registry.names[slots[i]]
+            message = ["Missing initial condition for ", 
+                       "Missing growth rate for ",
+                       "Missing carrying capacity for ",
+                       "Missing change rate for "][which]
+            raise KeyError(message+key+".")
+        
     
-    def dict_into_matrix(self, k, K, c):
+    def sparse_matrix(self, k, K, c):
         """
-        This method converts the intMatrix, that is a dictionary,
-        into a square matrix.
+        This method builds the interaction matrix as a SciPy CSR matrix, 
+        indexed by the position of the species in the species list.
+        The interactions that have not been set are zero.
         Parameters k, K, c are needed in order to compute the diagonal 
         values.
         
         """
         
-        for key1 in self.species_list:
-            for key2 in self.species_list:
-                if (key1 != key2) and ( (key1,key2) not in self.intMatrix ):
-                    raise KeyError("The interaction of "+key1+" with respect to "+key2+" is missing.")            
-        
-        for key in self.species_list:
-            if not (key in self.InitialCond.keys()):
-                raise KeyError("Missing initial condition for "+key+".")                
-            if not (key in self.GrowthRate.keys()):
-                raise KeyError("Missing growth rate for "+key+".")
-            if not (key in self.CarrCap.keys()):
-                raise KeyError("Missing carrying capacity for "+key+".")
-            if not (key in self.ChangeRate.keys()):
-                raise KeyError("Missing change rate for "+key+".")
+        slots = self.registry.slots()
+        N = len(slots)
         
-        N = len(self.species_list)
+        rows, cols, values = self.registry.coo_entries(slots)
         
         # Diagonal entries
-        for i, key in zip(range(N), self.species_list):
-            
-            aii = int(k[i]>0)*k[i]*c[i]/K[i]
-            
-            self.intMatrix.update({(key,key):aii})
-                
-        A = zeros((N,N))
+        rows = concatenate([rows, arange(N)])
+        cols = concatenate([cols, arange(N)])
+        values = concatenate([values, glvEngine.diagonal_terms(k, K, c)])
         
-        for I, i in zip( self.species_list, range(N) ):
-            for J, j in zip( self.species_list, range(N) ):     
-                A[i][j] = self.intMatrix[(I,J)]
+        from scipy.sparse import csr_matrix
+        
+        return csr_matrix((values, (rows, cols)), shape=(N,N))
     
-        return A
+    
+    def dict_into_matrix(self, k, K, c):
+        """
+        This method converts the interactions into a square matrix.
+        The interactions that have not been set are zero.
+        Parameters k, K, c are needed in order to compute the diagonal 
+        values.
+        
+        """
+        
+        self.check_parameters()
+    
+        return self.sparse_matrix(k, K, c).toarray()
     
 
-    def load_from_setup(self):
+    def load_from_setup(self, path='setup.csv'):
         """
         This method initializes the system with the data stored in the
-        setup file currently present in the directory.
+        setup file 'path', either binary or csv. By default the csv setup 
+        file currently present in the directory is used.
         """
         
-        data =pd.read_csv("setup.csv")
-        
-        N = len(list(data['Species']))
+        if binaryStorage.is_binary_setup(path):
+            names, n0, k, K, c, A = binaryStorage.load_setup(path)
         
-        for i in range(N):
-            name = list(data['Species'])[i]
-            n0 = list(data['Initial cond'])[i]
-            k = list(data['Growth rate'])[i]
-            K = list(data['Carrying cap'])[i]
-            c = list(data['Change rate'])[i]
+        else:
+            import pandas as pd
             
-            interactions = list(data['A_row'+str(i)])
-        
-            self.addSpecies(name)
-            self.setInitialCond(name, n0)
-            self.setGrowthRate(name, k)
-            self.setCarrCap(name, K)
-            self.setChangeRate(name, c)
+            data = pd.read_csv(path)
+            
+            names = list(data['Species'])
+            N = len(names)
+            n0 = data['Initial cond'].values
+            k = data['Growth rate'].values
+            K = data['Carrying cap'].values
+            c = data['Change rate'].values
             
-            for j in range(N):
-                if not (i==j):
-                    self.setInteraction(name, list(data['Species'])[j], interactions[j])
+            # The column 'A_row'+str(i) holds the i-th row of A
+            A = data[['A_row'+str(i) for i in range(N)]].values.T
+        
+        self.add_species_many(names, n0, k, K, c)
+        self.set_interactions_from_array(A, names)
 
 
     def addSpecies(self, name):
@@ -169,10 +264,51 @@ class Ecosystem:
         
         """
        
-        if (name in self.species_list):
-            raise TypeError("""Name already existing. Species must have different names.""")
-
-        self.species_list.append(name)
+        self.registry.add(name)
+        
+        
+    def add_species_many(self, names, initial_conds=None, growth_rates=None,
+                         carr_caps=None, change_rates=None):
+        """
+        names: list of strings.
+        initial_conds, growth_rates, carr_caps, change_rates: arrays (M,)
+            (optional)
+        
+        All the species in 'names' are added to the system at once, 
+        together with the parameters given.
+        
+        """
+        
+        slots = self.registry.add_many(names)
+        
+        params = [initial_conds, growth_rates, carr_caps, change_rates]
+        for i, values in enumerate(params):
+            if values is not None:
+                self.registry.params[i, slots] = values
+        
+        
+    def set_interactions_from_array(self, A, names=None):
+        """
+        A: array (M,M) or sparse matrix.
+        names: list of strings (optional).
+        
+        All the interactions among the species 'names' are replaced by the
+        off-diagonal entries of A, A[i][j] being the interaction of 
+        names[i] with respect to names[j]. If names is not given, A refers
+        to the whole species list. The diagonal of A is ignored, since it
+        is computed from the parameters.
+        
+        """
+        
+        if names is None:
+            slots = self.registry.slots()
+        else:
+            slots = [self.registry.slot(name) for name in names]
+        
+        if not (A.shape == (len(slots), len(slots))):
+            raise ValueError("The interaction matrix must have shape (M,M), M being the number of species.")
+        
+        self.registry.set_interactions(slots, A)
  
         
     def setInteraction(self, name1, name2, value):
@@ -190,10 +326,7 @@ class Ecosystem:
         
         """
         
-        if not ( (name1) in self.species_list ):
-            raise TypeError("""Species not found.""")
-            
-        self.intMatrix[(name1, name2)] = value  
+        self.registry.set_interaction(name1, name2, value)
         
         
     def setInitialCond(self, name, value):
@@ -206,10 +339,7 @@ class Ecosystem:
         
         """
         
-        if not ( (name) in self.species_list ):
-            raise TypeError("""Species not found.""")
-        
-        self.InitialCond.update({name:value})
+        self.registry.set_param('InitialCond', name, value)
         
     def setGrowthRate(self, name, value):
         """
@@ -221,10 +351,7 @@ class Ecosystem:
         
         """
         
-        if not ( (name) in self.species_list ):
-            raise TypeError("""Species not found.""")
-        
-        self.GrowthRate.update({name:value})
+        self.registry.set_param('GrowthRate', name, value)
             
     def setCarrCap(self, name, value):
         """
@@ -236,10 +363,7 @@ class Ecosystem:
         
         """
         
-        if not ( (name) in self.species_list ):
-            raise TypeError("""Species not found.""")
-        
-        self.CarrCap.update({name:value})    
+        self.registry.set_param('CarrCap', name, value)
 
     def setChangeRate(self, name, value):
         """
@@ -251,10 +375,7 @@ class Ecosystem:
         
         """
         
-        if not ( (name) in self.species_list ):
-            raise TypeError("""Species not found.""")
-        
-        self.ChangeRate.update({name:value})
+        self.registry.set_param('ChangeRate', name, value)
     
     
     def status(self, name=''):
@@ -278,9 +399,10 @@ class Ecosystem:
                 print("Carrying capacity: ", self.GrowthRate[name])    
             print("Change rate: ", self.ChangeRate[name])
             print("\nInteractions: ")
-            for key in self.intMatrix.keys():
+            interactions = self.intMatrix
+            for key in interactions.keys():
                 if (name in key):
-                    print(key, ": ", self.intMatrix[key])
+                    print(key, ": ", interactions[key])
             print('\n')
         
         else:
@@ -293,43 +415,685 @@ class Ecosystem:
             print('\n')
 
      
-    def solve(self, max_time=20, t_steps=2**7+1):
+    def solve(self, max_time=20, t_steps=2**7+1, backend='numpy', jacobian=True,
+              sparse=None, extinction=None, steady_state=None, blow_up=None,
+              stop=('steady_state', 'blow_up'), prune=False, resume=None,
+              at=None, cache=None, method='lsoda', rtol=None, atol=None,
+              max_step=None, t_eval=None):
         """
          max_time : float
              Maximum time reached in the integration.
          t_steps : int
              Number of steps in which the time is divided.
              In the form 2**n +1 performance is increased.
+         backend : string
+             'numpy': the system is integrated in memory, evaluating the
+             right hand side as a single matrix-vector product. No file
+             is written.
+             'codegen': legacy backend. The right hand side is generated
+             as Python code with a term for each interaction, compiled once
+             for each number of species and kept in memory. No file is 
+             written.
+             'numba': the right hand side and the Jacobian are compiled 
+             by Numba, which lowers the cost of each call for small and
+             medium systems. If Numba is not installed, a warning is 
+             issued and the 'numpy' backend is used.
+         jacobian : bool
+             Only for the 'numpy' and 'numba' backends. If True the 
+             analytic Jacobian of the system is given to the solver (in 
+             banded form when the interaction matrix allows it), otherwise
+             the solver estimates it by finite differences.
+         sparse : bool or None
+             Only for the 'numpy' and 'numba' backends. If True the 
+             interaction matrix is stored as a sparse matrix, so that the 
+             cost of each step scales with the number of interactions. If
+             None the choice is made from the size and density of the
+             interaction matrix.
+         extinction : float
+             Only for the 'numpy' backend. If given, a species is recorded
+             as extinct when its population falls below this threshold.
+         steady_state : float
+             Only for the 'numpy' backend. If given, a steady state is 
+             recorded when max|dn/dt| falls below this tolerance.
+         blow_up : float
+             Only for the 'numpy' backend. If given, a blow-up is recorded
+             when a population exceeds this threshold, or the solver 
+             fails.
+         stop : tuple
+             Kinds of the events above ('extinction', 'steady_state', 
+             'blow_up') that stop the integration. The solution is then 
+             truncated at the time of the event.
+         prune : bool
+             Only for the 'numpy' backend, with an extinction threshold.
+             If True an extinct species is removed from the system, that
+             is integrated further with the remaining species only. Its
+             population is zero after the time of the extinction.
+         resume : Solution
+             A previous solution of the system, to be continued instead of
+             starting from the initial conditions. The integration starts
+             from its state at time 'at', with the current parameters, and
+             the new segment, up to max_time, is appended to its 
+             trajectory up to 'at'. Only the new segment is integrated.
+             The species must be the same of the solution.
+         at : float
+             Only with resume. The integration restarts from the last time
+             of the solution not after 'at', e.g. to continue with new
+             parameters from a given time. If not given, the solution is 
+             continued from its last time, reusing its last step size.
+         cache : ResultCache
+             Cache of the solutions (see the module resultCache). If the 
+             same system has already been solved with the same options, 
+             the stored solution is returned without integrating, 
+             otherwise the new solution is stored. If None, the default 
+             cache is used if enabled with resultCache.enable. Not used 
+             with resume.
+         method : string
+             Only for the 'numpy' backend, without events. The integration
+             method (see the module integrationMethods): 'lsoda' (odeint),
+             'bdf' and 'radau' for stiff systems, 'rk45' and 'dop853' for
+             non-stiff ones, 'log' to integrate the logarithms of the 
+             populations, that can then never become negative, or 'auto'
+             to choose it from a probe of the stiffness of the system.
+         rtol, atol : float
+             Only for the 'numpy' and 'numba' backends. Relative and 
+             absolute tolerances of the solver. By default the ones of 
+             odeint (1.49012e-8).
+         max_step : float
+             Only for the 'numpy' and 'numba' backends. Maximum step size
+             of the solver. Unlimited by default.
+         t_eval : array
+             Times at which the solution is computed, in increasing order,
+             instead of the grid of t_steps times up to max_time. The 
+             initial time is added if it is not the first one. The step
+             sizes are chosen by the solver, not by these times.
+        
+         Returns
+         -------
+         A Solution object, that is also stored as the attribute 
+         'solution' of the system. The times of the events are in its
+         attribute 'events', the time of each stage and the counters of
+         the solver in its attribute 'stats' (see the module solveStats).
+         With resume, the statistics are the ones of the new segment. 
+         With method='auto', the method chosen is in stats.extra.
+         The solution returned by the cache has the statistics of the 
+         solve that stored it, if kept in memory, and the stage 'cache'.
+         Its arrays are read-only.
+         No file is written: use saveSolution or Solution.to_csv to write 
+         the solution.
+         
+        """
+        if not (backend in ('numpy', 'numba', 'codegen')):
+            raise ValueError("Unknown backend: "+str(backend)+".")
+        
+        if not ((method in integrationMethods.METHODS) or (method == 'auto')):
+            raise ValueError("Unknown method: "+str(method)+".")
+        
+        h0 = 0.
+        t0 = 0.
+        if resume is not None:
+            if not (resume.species == self.species_list):
+                raise ValueError("The species of the solution to resume are not the ones of the system.")
+            if at is None:
+                start = len(resume.t) - 1
+                if resume.stats is not None:
+                    h0 = resume.stats.step_size.get('last', 0.)
+            else:
+                start = int(resume.t.searchsorted(at, 'right')) - 1
+                if (start < 0):
+                    raise ValueError("The solution starts after the time 'at'.")
+            t0 = resume.t[start]
+        
+        if t_eval is None:
+            if (resume is not None) and not (max_time > t0):
+                raise ValueError("max_time must be after the time of the restart.")
+            t = linspace(t0, max_time, t_steps)
+        else:
+            t = array(t_eval, dtype=float)
+            if not ((t.ndim == 1) and (len(t) > 0) and all(diff(t) > 0)):
+                raise ValueError("t_eval must be an increasing sequence of times.")
+            if (t[0] < t0):
+                raise ValueError("t_eval must not start before the initial time.")
+            if (t[0] > t0):
+                t = concatenate([[t0], t])
+        
+        with_events = not ((extinction is None) and (steady_state is None) 
+                           and (blow_up is None)) or prune
+        if with_events and not (backend == 'numpy'):
+            raise ValueError("Events are only supported by the 'numpy' backend.")
+        if not (method == 'lsoda') and (with_events or 
+                                        not (backend == 'numpy')):
+            raise ValueError("Only the 'lsoda' method is supported with events or by the '"+backend+"' backend.")
+        tolerances = not ((rtol is None) and (atol is None) 
+                          and (max_step is None))
+        if tolerances and (backend == 'codegen'):
+            raise ValueError("Tolerances are not supported by the 'codegen' backend.")
+        if max_step is None:
+            max_step = inf
+        if (backend == 'numba') and not jitEngine.AVAILABLE:
+            warnings.warn("Numba is not installed: the 'numpy' backend is used.")
+        
+        stats = SolveStats(backend)
+        events = None
+        
+        if cache is None:
+            cache = resultCache.default_cache
+        key = None
+        if (cache is not None) and (resume is None):
+            with stats.stage('cache'):
+                options = {'backend': backend, 'jacobian': jacobian,
+                           'sparse': sparse, 'extinction': extinction,
+                           'steady_state': steady_state, 'blow_up': blow_up,
+                           'stop': sorted(stop), 'prune': prune,
+                           'method': method, 'rtol': rtol, 'atol': atol,
+                           'max_step': max_step}
+                key = resultCache.system_key(*self.system_arrays(sparse), t,
+                                             options)
+                hit = cache.get(key)
+            if hit is not None:
+                hit.stats = SolveStats(backend) if (hit.stats is None) \
+                            else copy.copy(hit.stats)
+                hit.stats.stages = dict(hit.stats.stages)
+                hit.stats.stages['cache'] = stats.stages['cache']
+                hit.stats.log()
+                self.solution = hit
+                return self.solution
+        
+        if (backend == 'codegen'):
+            with stats.stage('assembly'):
+                N, names, n0, k, K, c, A = self.create_data()
+                if resume is not None:
+                    n0 = array(resume.y[start], dtype=float)
+            with stats.stage('compile'):
+                systemDynamicGenerator.compile_System(N)
+            with stats.stage('integration'):
+                sol, info = systemDynamicGenerator.integrate_System(n0, t, k, 
+                                                           K, c, A, True)
+            stats.add_odeint(info, t)
+        
+        else:
+            with stats.stage('assembly'):
+                names, n0, k, K, c, A = self.system_arrays(sparse)
+                if resume is not None:
+                    n0 = array(resume.y[start], dtype=float)
+            
+            if with_events:
+                info = {}
+                with stats.stage('integration'):
+                    t, sol, events = glvEngine.integrate_events(n0, t, k, c, 
+                                         A, extinction, steady_state, blow_up,
+                                         stop, jacobian, prune, info, rtol,
+                                         atol, max_step)
+                stats.add_steps(info['nfev'], info['njev'], 
+                                info['step_sizes'])
+                stats.extra['restarts'] = info.get('restarts', 0)
+                if 'extinction' in events:
+                    events['extinction'] = {names[i]: time for i, time 
+                                            in events['extinction'].items()}
+            elif (backend == 'numba'):
+                with stats.stage('integration'):
+                    sol, info = jitEngine.integrate(n0, t, k, c, A, jacobian, 
+                                                    True, h0, rtol, atol, 
+                                                    max_step)
+                stats.add_odeint(info, t)
+            else:
+                with stats.stage('integration'):
+                    sol = integrationMethods.integrate(n0, t, k, c, A, method,
+                                                       jacobian, rtol, atol,
+                                                       max_step, h0, stats)
+        
+        with stats.stage('result'):
+            if resume is not None:
+                events = merge_events(resume.events, t[0], events)
+                t = concatenate([resume.t[:start], t])
+                sol = concatenate([resume.y[:start], sol])
+            self.solution = Solution(t, sol, names, events)
         
+        self.solution.stats = stats
+        stats.log()
+        
+        if key is not None:
+            cache.put(key, self.solution)
+        
+        return self.solution
+        
+        
+    def solve_stream(self, max_time=20, t_steps=2**7+1, chunk_steps=1024,
+                     store=None, jacobian=True, sparse=None):
         """
-        N = len(self.species_list)
-     
-        df = sysFunctions.create_dfSetUp(self)
-        df.to_csv(r'setup.csv', index=True, header=True)
+        Integrates the system as solve with the 'numpy' backend, yielding
+        the solution in chunks, so that long horizons can be processed or 
+        written to disk without holding the whole trajectory in memory.
+        The solver keeps its state from a chunk to the next one.
+
+        Parameters
+        ----------
+         max_time, t_steps, jacobian, sparse:
+             The same as solve.
+         chunk_steps : int
+             Maximum number of times in each chunk.
+         store : string
+             If given, the chunks are also written into the new directory
+             'store', in the binary format of saveSolution. It can be 
+             opened with binaryStorage.open_solution.
+
+        Yields
+        ------
+        Solution objects with consecutive slices of the time grid.
+
+        """
+
+        if (chunk_steps < 1):
+            raise ValueError("chunk_steps must be positive.")
+
+        names, n0, k, K, c, A = self.system_arrays(sparse)
+        chunks = glvEngine.integrate_chunks(n0, max_time, t_steps, k, c, A,
+                                            chunk_steps, jacobian)
+
+        if store is None:
+            for t, y in chunks:
+                yield Solution(t, y, names)
+            return
+
+        with binaryStorage.SolutionWriter(store, t_steps, names) as writer:
+            for t, y in chunks:
+                writer.append(t, y)
+                yield Solution(t, y, names)
+
+    def ensemble_arrays(self, initial_conds=None, growth_rates=None, 
+                        carr_caps=None, change_rates=None, interactions=None):
+        """
+        Returns the arrays (n0, k, K, c, A) of B variants of the current 
+        setup, with shapes (B,N) and (B,N,N). The parameters have the same
+        meaning of solve_ensemble. The diagonal of each A is computed from
+        the parameters of its member.
         
-        sysFunctions.generate_Integrator(N, max_time, t_steps)
-        sysFunctions.exe_Integrator()   
- 
+        """
+        N, names, n0, k, K, c, A = self.create_data()
+        
+        params = [initial_conds, growth_rates, carr_caps, change_rates]
+        given = [array(p, dtype=float) for p in params + [interactions] 
+                 if p is not None]
+        
+        B = 1
+        if (len(given) > 0):
+            B = len(given[0])
+        for p in given:
+            if not (len(p) == B):
+                raise ValueError("All the parameter sets must have the same length.")
+        
+        current = [n0, k, K, c]
+        for i in range(4):
+            if params[i] is None:
+                params[i] = broadcast_to(array(current[i], dtype=float), (B,N))
+            else:
+                params[i] = array(params[i], dtype=float).reshape(B,N)
+        n0, k, K, c = params
         
-    @staticmethod
-    def plot():
+        if interactions is None:
+            A = broadcast_to(A, (B,N,N)).copy()
+        else:
+            A = array(interactions, dtype=float).reshape(B,N,N)
+        A[:, arange(N), arange(N)] = glvEngine.diagonal_terms(k, K, c)
+
+        return n0, k, K, c, A
+
+
+    def solve_ensemble(self, max_time=20, t_steps=2**7+1, initial_conds=None,
+                       growth_rates=None, carr_caps=None, change_rates=None,
+                       interactions=None, jacobian=True):
         """
-        This method plots the solution contained in the file solution.csv.
+        Integrates at once B variants of the current setup, each one with 
+        its own set of parameters. The right hand side of the whole batch
+        is evaluated as a single (B,N) array operation.
         
+         max_time : float
+             Maximum time reached in the integration.
+         t_steps : int
+             Number of steps in which the time is divided.
+         initial_conds : array (B,N)
+         growth_rates : array (B,N)
+         carr_caps : array (B,N)
+         change_rates : array (B,N)
+             Parameters of each member of the batch. The columns follow the
+             order of the species list. If not given, the current values of 
+             the system are used for every member.
+         interactions : array (B,N,N)
+             Interaction matrices of each member of the batch, with the 
+             same meaning of the matrix returned by create_data. The 
+             diagonal is ignored, since it is computed from the other
+             parameters. If not given, the current matrix is used.
+         jacobian : bool
+             If True the analytic Jacobian is given to the solver.
+        
+         Returns
+         -------
+         The array (B, t_steps, N) of the solutions.
+         
         """
-        data = pd.read_csv('solution.csv')
+        n0, k, K, c, A = self.ensemble_arrays(initial_conds, growth_rates,
+                                              carr_caps, change_rates,
+                                              interactions)
 
-        Species_names = list(data.columns[1:])
-        N = len(Species_names)
-        t = list(data['Unnamed: 0'])
+        t = linspace(0, max_time, t_steps)
+        
+        return glvEngine.integrate_batch(n0, t, k, c, A, jacobian)
+        
+        
+    def scan(self, points, max_time=20, t_steps=2**7+1, processes=None,
+             jacobian=True):
+        """
+        Solves independent variants of the current setup on a pool of 
+        processes. See the module parallelScan for further details.
+        
+         points : list of dict
+             Each point is a dictionary {(attribute, key): value}, as 
+             returned by parallelScan.grid_points or 
+             parallelScan.random_points. attribute is one of 'InitialCond',
+             'GrowthRate', 'CarrCap', 'ChangeRate' or 'intMatrix'.
+         max_time : float
+             Maximum time reached in the integration.
+         t_steps : int
+             Number of steps in which the time is divided.
+         processes : int
+             Number of worker processes. If None all the cores are used.
+         jacobian : bool
+             If True the analytic Jacobian is given to the solver.
+        
+         Returns
+         -------
+         A generator of the tuples (i, point, solution), in the order of
+         points, solution being a Solution object.
+        
+        """
+        scanner = parallelScan.ParallelScan(self, processes)
+        
+        return scanner.run(points, max_time, t_steps, jacobian)
+
+
+    def sensitivity(self, parameters=None, max_time=20, t_steps=2**7+1,
+                    t_eval=None, rtol=None, atol=None):
+        """
+        Integrates the system together with the derivatives of the
+        populations with respect to the parameters, in a single pass. See
+        the module sensitivityAnalysis for further details.
+
+         parameters : list
+             Tuples (attribute, key), as the keys of the points of
+             parallelScan: attribute is one of 'InitialCond', 'GrowthRate',
+             'CarrCap', 'ChangeRate' (key is the name of a species) or
+             'intMatrix' (key is the tuple (name1, name2)). Only the
+             interactions of a species with the ones after it in the
+             species list enter the equations: the others have zero
+             sensitivity. If None, the growth rates, carrying capacities
+             and change rates of all the species, and all the interactions
+             set that enter the equations.
+         max_time, t_steps, t_eval, rtol, atol :
+             The same as solve.
+
+         Returns
+         -------
+         A Sensitivity object, with the solution and the array S of the
+         derivatives, S[t,i,p] being the one of the population of the i-th
+         species at the t-th time with respect to the p-th parameter.
+
+        """
+        names, n0, k, K, c, A = self.system_arrays()
+        position = {name: i for i, name in enumerate(names)}
+
+        if parameters is None:
+            parameters = [(attribute, name) for attribute in
+                          ('GrowthRate', 'CarrCap', 'ChangeRate')
+                          for name in names]
+            rows, cols = self.system_arrays(True)[-1].nonzero()
+            parameters += [('intMatrix', (names[i], names[j]))
+                           for i, j in zip(rows.tolist(), cols.tolist())
+                           if (i < j)]
+
+        indexed = []
+        for attribute, key in parameters:
+            keys = key if (attribute == 'intMatrix') else (key,)
+            for name in keys:
+                if not (name in position):
+                    raise TypeError("""Species not found.""")
+            positions = tuple(position[name] for name in keys)
+            indexed.append((attribute, positions if (attribute == 'intMatrix')
+                                       else positions[0]))
+
+        if t_eval is None:
+            t = linspace(0, max_time, t_steps)
+        else:
+            t = array(t_eval, dtype=float)
+            if not ((t.ndim == 1) and (len(t) > 0) and all(diff(t) > 0)
+                    and (t[0] >= 0)):
+                raise ValueError("t_eval must be an increasing sequence of times.")
+            if (t[0] > 0):
+                t = concatenate([[0.], t])
+
+        y, S = sensitivityAnalysis.forward_sensitivity(n0, t, k, K, c, A,
+                                                       indexed, rtol, atol)
+
+        return sensitivityAnalysis.Sensitivity(Solution(t, y, names),
+                                               parameters, S)
+
+
+    def fit(self, times, observations, free_parameters, bounds=None, 
+            signs=None, sigma=None, starts=1, processes=None, seed=None,
+            loss='linear', rtol=None, atol=None, max_nfev=None):
+        """
+        Fits the free parameters to observed time series of the 
+        populations, by least squares with the exact Jacobian given by the
+        sensitivities. See the module parameterFitting for further details.
+        The system is not modified: use FitResult.apply to set the fitted
+        values.
+        
+         times : array
+             Times of the observations, increasing and not negative. The
+             integration always starts from time 0 with the current 
+             initial conditions (unless they are free parameters).
+         observations : dict or array
+             {name: array} with a value for each time, for the species
+             observed, or an array (times, species) for all of them. NaN
+             are missing values.
+         free_parameters : list
+             Parameters to be fitted, as tuples (attribute, key) like the
+             ones of sensitivity. The other parameters keep their values.
+         bounds : dict
+             {(attribute, key): (lower, upper)}. By default the initial
+             conditions, carrying capacities and change rates are positive
+             and the other parameters are unbounded.
+         signs : dict or string
+             {(attribute, key): +1 or -1}, constraining the sign of the
+             parameter. If 'keep', every free interaction keeps the sign
+             of its current value.
+         sigma : float or dict
+             Uncertainty of the observations, dividing the residuals: for
+             all the species or as {name: float or array}. 1 by default.
+         starts : int
+             Number of starts of the optimization. The first one is from 
+             the current parameters, the others from random points.
+         processes : int
+             Number of processes running the starts. If None all the cores
+             are used.
+         seed : int
+             Seed of the random starting points.
+         loss : string
+             Loss function of scipy.optimize.least_squares, e.g. 'soft_l1'
+             to lower the weight of outliers.
+         rtol, atol : float
+             Tolerances of the integration.
+         max_nfev : int
+             Maximum number of evaluations of each start.
+        
+         Returns
+         -------
+         A FitResult object, with the fitted parameters, their standard 
+         errors and correlations, the cost and the fitted solution.
+        
+        """
+        names, n0, k, K, c, A = self.system_arrays(False)
+        index = {name: i for i, name in enumerate(names)}
+        
+        for attribute, key in free_parameters:
+            keys = key if (attribute == 'intMatrix') else (key,)
+            for name in keys:
+                if not (name in index):
+                    raise TypeError("""Species not found.""")
+        
+        times = array(times, dtype=float)
+        if not ((times.ndim == 1) and (len(times) > 0) 
+                and all(diff(times) > 0) and (times[0] >= 0)):
+            raise ValueError("times must be an increasing sequence of times.")
+        t = times if (times[0] == 0) else concatenate([[0.], times])
+        rows = arange(len(t) - len(times), len(t))
+        
+        system = (index, array(n0), array(k), array(K), array(c), array(A))
+        
+        return parameterFitting.fit(system, list(names), list(free_parameters),
+                                    t, rows, observations, bounds, signs, 
+                                    sigma, starts, processes, seed=seed, 
+                                    loss=loss, rtol=rtol, atol=atol, 
+                                    max_nfev=max_nfev)
 
-        fig, ax = plt.subplots()
-        for i, name in zip(range(N), Species_names):
-            nt = list(data[name])
-            ax.plot(t, nt, linewidth=4, label=name)
 
-        ax.set_facecolor('white')
-        ax.legend(loc='best')
+    def equilibrium(self, species=None, tol=0.):
+        """
+        Computes the fixed point of the system directly, solving a linear
+        system instead of integrating.
+        
+         species : list
+             Names of the species alive at the fixed point. The others are
+             set to zero. If not given, all the species are alive (interior
+             fixed point).
+         tol : float
+             The fixed point is feasible if the populations of the species
+             alive are all above tol.
+        
+         Returns
+         -------
+         An Equilibrium object, with the populations, the feasibility, the
+         eigenvalues of the Jacobian (stability) and the invasion rates of
+         the species that are not alive.
+         
+        """
+        names, n0, k, K, c, A = self.system_arrays(False)
+        A_eff = glvEngine.effective_matrix(A)
+        
+        if species is None:
+            n = equilibriumAnalysis.interior_equilibrium(k, c, A_eff)
+        else:
+            for name in species:
+                if not (name in self.registry):
+                    raise TypeError("""Species not found.""")
+            subset = [names.index(name) for name in species]
+            n = equilibriumAnalysis.subset_equilibria(k, c, A_eff, [subset])[0]
+        
+        return equilibriumAnalysis.Equilibrium(names, n, k, c, A_eff, tol)
+        
+        
+    def stability(self, state=None):
+        """
+        Returns the eigenvalues of the Jacobian of the system, sorted by 
+        decreasing real part. A fixed point is stable if all of them have
+        negative real part.
+        
+         state : dict, array or Equilibrium
+             The state where the Jacobian is computed, as {name: population},
+             as an array in the order of the species list, or as a fixed
+             point returned by equilibrium. If not given, the interior fixed
+             point is used.
+        
+        """
+        names, n0, k, K, c, A = self.system_arrays(False)
+        A_eff = glvEngine.effective_matrix(A)
+        
+        if state is None:
+            n = equilibriumAnalysis.interior_equilibrium(k, c, A_eff)
+        elif isinstance(state, equilibriumAnalysis.Equilibrium):
+            n = state.n
+        elif isinstance(state, dict):
+            n = array([state[name] for name in names], dtype=float)
+        else:
+            n = array(state, dtype=float)
+        
+        return equilibriumAnalysis.jacobian_eigenvalues(n, k, c, A_eff)
+        
+        
+    def boundary_equilibria(self, max_size=None, feasible_only=True, tol=0.):
+        """
+        Searches the fixed points of every subset of species, each subset
+        being solved as a linear system. 
+        The long-run state of the system is usually the one that is 
+        feasible, stable and saturated (no absent species can invade).
+        
+         max_size : int
+             Maximum number of species alive. If not given, all the subsets
+             are searched, that is allowed only up to 
+             equilibriumAnalysis.MAX_SUBSET_SPECIES species.
+         feasible_only : bool
+             If True only the feasible fixed points are returned.
+         tol : float
+             Feasibility threshold, the same as equilibrium.
+        
+         Returns
+         -------
+         A list of Equilibrium objects, in order of increasing number of 
+         species alive.
+         
+        """
+        names, n0, k, K, c, A = self.system_arrays(False)
+        A_eff = glvEngine.effective_matrix(A)
+        
+        subsets = equilibriumAnalysis.candidate_subsets(len(names), max_size)
+        n = equilibriumAnalysis.subset_equilibria(k, c, A_eff, subsets)
+        
+        found = []
+        for row, subset in zip(n, subsets):
+            if feasible_only and not all(row[list(subset)] > tol):
+                continue
+            found.append(equilibriumAnalysis.Equilibrium(names, row, k, c,
+                                                         A_eff, tol))
+        
+        return found
+        
+        
+    def equilibrium_ensemble(self, growth_rates=None, carr_caps=None, 
+                             change_rates=None, interactions=None, tol=0.):
+        """
+        Computes at once the interior fixed points of B variants of the 
+        current setup. The parameters have the same meaning of 
+        solve_ensemble.
+        
+         Returns
+         -------
+         The tuple (n, feasible, eigenvalues): the populations (B,N), the
+         feasibility (B,) and the eigenvalues of the Jacobians (B,N), 
+         sorted by decreasing real part. A member is stable if the real 
+         part of its first eigenvalue is negative.
+         
+        """
+        n0, k, K, c, A = self.ensemble_arrays(None, growth_rates, carr_caps,
+                                              change_rates, interactions)
+        A_eff = triu(A) - swapaxes(triu(A, 1), 1, 2)
+        
+        n = equilibriumAnalysis.interior_equilibrium(k, c, A_eff)
+        feasible = (n > tol).all(axis=1)
+        eigenvalues = equilibriumAnalysis.jacobian_eigenvalues(n, k, c, A_eff)
+        
+        return n, feasible, eigenvalues
+        
+        
+    def plot(self, path=None, **options):
+        """
+        This method plots the last solution computed by solve. 
+        If path is given, the figure is saved into that file without
+        being displayed. The other options (top, method, max_points, ...)
+        are described in solutionPlot.plot_solution.
+        
+        """
+        if self.solution is None:
+            raise TypeError("The system must be solved before.")
+        
+        return self.solution.plot(path, **options)
  
  
     def removeSpecies(self, name):
@@ -341,43 +1105,21 @@ class Ecosystem:
         
         """
                 
-        if not ( name in self.species_list ):
-            raise TypeError("""Species not found.""")
-        
-        self.species_list.remove(name)
-   
-        if name in self.InitialCond.keys():
-            self.InitialCond.pop(name)
-        if name in self.GrowthRate.keys():
-            self.GrowthRate.pop(name)
-        if name in self.CarrCap.keys():
-            self.CarrCap.pop(name)
-        if name in self.ChangeRate.keys():
-            self.ChangeRate.pop(name)
-        
-        # Needed an external key list since it's not possible to remove
-        # elements from a dictionary while iterating over it.
-        
-        key_blacklist =[]
-        for key in self.intMatrix.keys():
-            if (name in key):
-                key_blacklist.append(key)
-        for key in key_blacklist:
-            self.intMatrix.pop(key)
+        self.registry.remove(name)
         
     
-    def saveSetup(self, name = ''):
+    def saveSetup(self, name = '', format='binary'):
         """
         name: string.
+        format: string.
         
         The current setup of the system is saved into the folder 
         'saved_setups'. If 'name' is not given, it will be saved with 
         the current date and time inside the name.
+        With format 'binary' the setup is saved as a single .npz archive
+        (see the module binaryStorage), with format 'csv' as a csv file.
         
         """
-        df = sysFunctions.create_dfSetUp(self)
-        df.to_csv(r'setup.csv', index=True, header=True)
-        
         path = "saved_setups/"
         
         if (name == ''):
@@ -387,25 +1129,45 @@ class Ecosystem:
             if (os.path.isfile(path+name)):
                 raise TypeError("A setup saved with this name is already present!")
         
-        os.rename('setup.csv', path+name)
+        if (format == 'binary'):
+            names, n0, k, K, c, A = self.system_arrays(sparse=True)
+            binaryStorage.save_setup(path+name, names, n0, k, K, c, A)
+        elif (format == 'csv'):
+            df = sysFunctions.create_dfSetUp(self)
+            df.to_csv(path+name, index=True, header=True)
+        else:
+            raise ValueError("Unknown format: "+str(format)+".")
 
-    def saveSolution(self, name = ''):
+    def saveSolution(self, name = '', format='binary'):
         """
         name: string.
+        format: string.
         
-        The current solution file of the system is saved into the folder 
+        The current solution of the system is saved into the folder 
         'saved_solutions'. If 'name' is not given, it will be saved with 
         the current date and time inside the name.
+        With format 'binary' the solution is saved as a directory of .npy
+        files, that can be memory-mapped by loadSolution. With format 'csv'
+        it is saved as a csv file.
         
         """
-        if not (os.path.isfile('solution.csv')):
-            raise TypeError("Solution file not present. The system must be solved before.")
+        if self.solution is None:
+            raise TypeError("Solution not present. The system must be solved before.")
         
         if (name == ''):
             name = datetime.now().strftime("solution_%d-%m-%Y-%H:%M:%S")
                 
         path = "saved_solutions/"
-        os.rename('solution.csv', path+name)
+        
+        if os.path.exists(path+name):
+            raise TypeError("A solution saved with this name is already present!")
+        
+        if (format == 'binary'):
+            binaryStorage.save_solution(path+name, self.solution)
+        elif (format == 'csv'):
+            self.solution.to_csv(path+name)
+        else:
+            raise ValueError("Unknown format: "+str(format)+".")
     
     def loadSetup(self, name):
         """
@@ -413,24 +1175,33 @@ class Ecosystem:
         
         The system is initialized with the status given by the file 
         'name', that should be a setup previously saved or already 
-        present in the folder 'saved_setups'.
+        present in the folder 'saved_setups'. Both binary and csv setups
+        are accepted.
         
         """        
-        if (os.path.isfile('setup.csv')):
-            os.remove('setup.csv')
-
-        # Shouldn't iterate on a list that is modified inside the cycle itself. 
-        # So this external list is needed.
-        species_to_delete = []
-        for i in range(len(self.species_list)):
-            species_to_delete.append(self.species_list[i])
-        
-        for spec_name in species_to_delete:
-            self.removeSpecies(spec_name)
-           
-        name = 'saved_setups/'+name
-        shutil.copy(name, 'setup.csv')
-        
-        self.load_from_setup()
+        self.registry = SpeciesRegistry()
+        
+        self.load_from_setup('saved_setups/'+name)
+    
+    def loadSolution(self, name, mmap=True):
+        """
+        name: string.
+        mmap: bool.
+        
+        Loads the solution 'name' from the folder 'saved_solutions' and
+        makes it the current solution of the system. Binary solutions are
+        memory-mapped if mmap is True, so that they can be sliced with 
+        Solution.select without reading the whole file. For csv solutions
+        the time grid is not available, and the row index is used.
+        
+        """
+        path = 'saved_solutions/'+name
+        
+        if os.path.isdir(path):
+            self.solution = binaryStorage.open_solution(path, mmap)
+        else:
+            self.solution = Solution.from_csv(path)
+        
+        return self.solution
     
     
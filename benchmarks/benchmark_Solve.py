@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:05:48 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Benchmark of the solve throughput against the number of species.
+
+Random generalized Lotka Volterra systems are generated with dense and
+sparse interactions, and each stage of the solution is timed separately:
+setup assembly, code generation, compile, integration and result I/O, for
+every solver backend. The 'numba' backend is skipped if Numba is not
+installed. The results are written as JSON, so that they can be
+compared across versions.
+The time of importing the package in a new interpreter is measured too,
+and checked against a budget: pandas, matplotlib, SciPy and Numba must not
+be imported until they are used.
+
+Usage:
+    python benchmarks/benchmark_Solve.py --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from importlib.metadata import version
+
+import numpy as np
+import scipy
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import LVsystem
+import glvEngine
+import jitEngine
+import sysFunctions
+import systemDynamicGenerator
+from LVsolution import Solution
+
+
+# Modules that the package must not import until they are used
+HEAVY_MODULES = ('pandas', 'matplotlib', 'scipy', 'numba')
+
+
+def import_time(module, repeats):
+    """
+    Returns the minimum wall-clock time of importing module in a new 
+    interpreter, and the list of the HEAVY_MODULES imported with it.
+
+    """
+
+    code = ('import sys, time\n'
+            'start = time.perf_counter()\n'
+            'import '+module+'\n'
+            'print(time.perf_counter() - start)\n'
+            'print(",".join(m for m in '+repr(HEAVY_MODULES)
+            +' if m in sys.modules))')
+
+    best = np.inf
+    for i in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                                capture_output=True, text=True, 
+                                check=True).stdout.split('\n')
+        best = min(best, float(output[0]))
+
+    return best, [m for m in output[1].split(',') if m]
+
+
+def random_ecosystem(N, density, seed=0):
+    """
+    Returns an Ecosystem with N species and a random antisymmetric
+    interaction matrix with the given fraction of non-zero entries.
+    About half of the species are preys (k>0), the others predators.
+
+    """
+
+    rng = np.random.default_rng(seed)
+
+    names = ['s'+str(i) for i in range(N)]
+    k = rng.uniform(0.1, 1, N) * rng.choice([-1, 1], N)
+
+    eco = LVsystem.Ecosystem()
+    eco.add_species_many(names, initial_conds=rng.uniform(1, 10, N),
+                         growth_rates=k, carr_caps=rng.uniform(1e3, 1e4, N),
+                         change_rates=rng.uniform(10, 100, N))
+
+    upper = np.triu(rng.uniform(-1, 1, (N,N)) * (rng.random((N,N)) < density), 1)
+    eco.set_interactions_from_array(upper - upper.T)
+
+    return eco
+
+
+def best_time(function, repeats):
+    """
+    Returns the minimum wall-clock time of 'repeats' calls of function,
+    and the result of the last call.
+
+    """
+
+    best = np.inf
+    for i in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def run_case(N, density, args):
+    """
+    Times every stage for one system. Returns a list of records.
+    """
+
+    eco = random_ecosystem(N, density, args.seed)
+    t = np.linspace(0, args.max_time, args.t_steps)
+    records = []
+
+    def record(backend, stage, seconds, **extra):
+        entry = {'N': N, 'density': density, 'backend': backend,
+                 'stage': stage, 'seconds': seconds}
+        entry.update(extra)
+        records.append(entry)
+
+    def assemble():
+        eco.registry.assembled = None
+        return eco.create_data()
+
+    seconds, data = best_time(assemble, args.repeats)
+    record('all', 'create_data', seconds)
+    seconds, df = best_time(lambda: sysFunctions.create_dfSetUp(eco), args.repeats)
+    record('codegen', 'create_dfSetUp', seconds)
+
+    # In-memory backends
+    for sparse in (False, True):
+        backend = 'numpy-sparse' if sparse else 'numpy'
+        names, n0, k, K, c, A = eco.system_arrays(sparse)
+
+        for jacobian in (True, False):
+            seconds, (y, info) = best_time(
+                lambda: glvEngine.integrate(n0, t, k, c, A, jacobian, True),
+                args.repeats)
+            record(backend, 'integration', seconds, jacobian=jacobian,
+                   nfev=int(info['nfe'][-1]), njev=int(info['nje'][-1]),
+                   steps=int(info['nst'][-1]))
+
+        # Compiled kernels: the first call includes the compilation.
+        if not jitEngine.AVAILABLE:
+            record(backend.replace('numpy', 'numba'), 'skipped', None)
+            continue
+        for jacobian in (True, False):
+            seconds, _ = best_time(
+                lambda: jitEngine.integrate(n0, t, k, c, A, jacobian), 1)
+            record(backend.replace('numpy', 'numba'), 'first_integration',
+                   seconds, jacobian=jacobian)
+            seconds, _ = best_time(
+                lambda: jitEngine.integrate(n0, t, k, c, A, jacobian),
+                args.repeats)
+            record(backend.replace('numpy', 'numba'), 'integration', seconds,
+                   jacobian=jacobian)
+
+    names, n0, k, K, c, A = eco.system_arrays(False)
+    y = glvEngine.integrate(n0, t, k, c, A)
+    solution = Solution(t, y, names)
+    seconds, _ = best_time(lambda: Solution(t, y, names), args.repeats)
+    record('numpy', 'result', seconds)
+
+    # Legacy code generation backend
+    if (N > args.codegen_max):
+        record('codegen', 'skipped', None)
+        return records
+
+    seconds, code = best_time(
+        lambda: systemDynamicGenerator.merge_All(N, args.max_time, args.t_steps),
+        args.repeats)
+    record('codegen', 'merge_All', seconds, source_bytes=len(code))
+
+    seconds, compiled = best_time(lambda: compile(code, 'integrator.py', 'exec'),
+                                  args.repeats)
+    record('codegen', 'compile', seconds)
+
+    # In-memory compiled system: the first call generates and compiles it,
+    # the following ones only integrate.
+    systemDynamicGenerator.compile_System.cache_clear()
+    n0_list, k_list, K_list, c_list, A_list = data[2:]
+
+    def cached_solve():
+        return systemDynamicGenerator.integrate_System(n0_list, t, k_list, 
+                                                       K_list, c_list, A_list)
+
+    seconds, _ = best_time(cached_solve, 1)
+    record('codegen', 'cold_solve', seconds)
+    seconds, _ = best_time(cached_solve, args.repeats)
+    record('codegen', 'cached_solve', seconds)
+
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        df.to_csv('setup.csv', index=True, header=True)
+        seconds, _ = best_time(lambda: exec(compiled, {}), args.repeats)
+        record('codegen', 'exec', seconds)
+
+        seconds, _ = best_time(lambda: solution.to_csv('solution.csv'),
+                               args.repeats)
+        record('codegen', 'write_csv', seconds)
+        seconds, _ = best_time(lambda: Solution.from_csv('solution.csv', t),
+                               args.repeats)
+        record('codegen', 'read_csv', seconds)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+    return records
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[2, 10, 50, 200, 1000])
+    parser.add_argument('--densities', type=float, nargs='+',
+                        default=[1.0, 0.05])
+    parser.add_argument('--max-time', type=float, default=1.0)
+    parser.add_argument('--t-steps', type=int, default=2**7+1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--codegen-max', type=int, default=200,
+                        help='largest N run with the codegen backend')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--import-budget', type=float, default=0.25,
+                        help='maximum seconds for importing LVsystem')
+    parser.add_argument('--output', default='-',
+                        help="JSON file, '-' for the standard output")
+    args = parser.parse_args(argv)
+
+    imports = {}
+    for module in ('LVsystem', 'parallelScan'):
+        seconds, heavy = import_time(module, args.repeats)
+        imports[module] = {'seconds': seconds, 'heavy_modules': heavy,
+                           'budget': args.import_budget,
+                           'within_budget': (seconds <= args.import_budget)
+                                            and (len(heavy) == 0)}
+
+    results = []
+    for N in args.sizes:
+        for density in args.densities:
+            results.extend(run_case(N, density, args))
+
+    report = {
+        'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                 'python': platform.python_version(),
+                 'numpy': np.__version__, 'scipy': scipy.__version__,
+                 'numba': version('numba') if jitEngine.AVAILABLE else None,
+                 'machine': platform.machine(),
+                 'max_time': args.max_time, 't_steps': args.t_steps,
+                 'repeats': args.repeats},
+        'imports': imports,
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=1)
+    if (args.output == '-'):
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
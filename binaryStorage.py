@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:04:54 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Binary storage of setups and solutions.
+
+A setup is a single uncompressed .npz archive with the species' names,
+the parameters and the off-diagonal interactions in coordinate form, so
+that its size scales with the number of interactions.
+
+A solution is a directory with the time grid 't.npy', the populations
+'y.npy' and the species' names 'species.json'. An ensemble of solutions is
+stored in the same way, with 'y.npy' of shape (B,T,N). The populations are
+memory-mapped when opened, so that a slice by species or time window only
+reads the needed part of the file.
+"""
+
+import os
+import json
+import zipfile
+import numpy as np
+
+from LVsolution import Solution, time_window
+
+
+SETUP_VERSION = 1
+
+
+def is_binary_setup(path):
+    """
+    Returns True if the file 'path' is a setup saved by save_setup, False
+    if it is a csv setup.
+    """
+
+    return zipfile.is_zipfile(path)
+
+
+def save_setup(path, names, n0, k, K, c, A):
+    """
+    Saves a setup in the file 'path', with exactly this name.
+
+    Parameters
+    ----------
+    names: list
+    n0, k, K, c: arrays (N,)
+    A: array (N,N) or sparse matrix
+        Interaction matrix. The diagonal is not stored, since it is
+        computed from the parameters.
+
+    """
+
+    from scipy.sparse import coo_matrix
+
+    A = coo_matrix(A)
+    off = (A.row != A.col) & (A.data != 0)
+
+    with open(path, 'wb') as f:
+        np.savez(f, version=SETUP_VERSION, names=np.array(names, dtype=str),
+                 n0=n0, k=k, K=K, c=c, A_row=A.row[off], A_col=A.col[off],
+                 A_data=A.data[off])
+
+
+def load_setup(path):
+    """
+    Reads a setup saved by save_setup.
+
+    Returns
+    -------
+    The tuple (names, n0, k, K, c, A), A being a CSR matrix with the
+    off-diagonal interactions.
+
+    """
+
+    from scipy.sparse import coo_matrix
+
+    with np.load(path) as data:
+        names = data['names'].tolist()
+        N = len(names)
+        A = coo_matrix((data['A_data'], (data['A_row'], data['A_col'])),
+                       shape=(N,N)).tocsr()
+
+        return (names, data['n0'], data['k'], data['K'], data['c'], A)
+
+
+def _write_arrays(path, t, y, species):
+
+    os.makedirs(path)
+    np.save(os.path.join(path, 't.npy'), np.asarray(t, dtype=float))
+    np.save(os.path.join(path, 'y.npy'), np.asarray(y, dtype=float))
+    with open(os.path.join(path, 'species.json'), 'w') as f:
+        json.dump(list(species), f)
+
+
+def _read_arrays(path, mmap):
+
+    t = np.load(os.path.join(path, 't.npy'))
+    y = np.load(os.path.join(path, 'y.npy'), mmap_mode='r' if mmap else None)
+    with open(os.path.join(path, 'species.json')) as f:
+        species = json.load(f)
+
+    return t, y, species
+
+
+def save_solution(path, solution):
+    """
+    Saves a Solution into the new directory 'path'.
+    """
+
+    _write_arrays(path, solution.t, solution.y, solution.species)
+
+
+class SolutionWriter:
+    """
+    SolutionWriter(path, t_steps, species)
+
+    Writes a solution into the new directory 'path' one chunk at a time, in
+    the format of save_solution. The files are preallocated for t_steps 
+    times and filled through a memory map, so that the whole solution is 
+    never held in memory.
+
+    Methods
+    -------
+    append(t, y)
+    close()
+
+    """
+
+    def __init__(self, path, t_steps, species):
+
+        os.makedirs(path)
+        self.path = path
+        self.filled = 0
+        self.t = np.lib.format.open_memmap(os.path.join(path, 't.npy'), 
+                                           mode='w+', dtype=float,
+                                           shape=(t_steps,))
+        self.y = np.lib.format.open_memmap(os.path.join(path, 'y.npy'), 
+                                           mode='w+', dtype=float,
+                                           shape=(t_steps, len(species)))
+        with open(os.path.join(path, 'species.json'), 'w') as f:
+            json.dump(list(species), f)
+
+    def append(self, t, y):
+        """
+        Writes the chunk of times t (M,) and populations y (M,N) after the
+        ones already written.
+        """
+
+        end = self.filled + len(t)
+        if (end > len(self.t)):
+            raise ValueError("More times than the ones declared.")
+
+        self.t[self.filled:end] = t
+        self.y[self.filled:end] = y
+        self.filled = end
+
+    def close(self):
+        """
+        Flushes the files to disk.
+        """
+
+        self.t.flush()
+        self.y.flush()
+        self.t = None
+        self.y = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_solution(path, mmap=True):
+    """
+    Opens a solution saved by save_solution. If mmap is True the
+    populations are memory-mapped instead of being read.
+
+    Returns
+    -------
+    Solution
+
+    """
+
+    return Solution(*_read_arrays(path, mmap))
+
+
+def save_ensemble(path, t, y, species):
+    """
+    Saves the solutions of an ensemble, as returned by
+    Ecosystem.solve_ensemble, into the new directory 'path'.
+
+    Parameters
+    ----------
+    t: array (T,)
+    y: array (B,T,N)
+    species: list
+
+    """
+
+    _write_arrays(path, t, y, species)
+
+
+class Ensemble:
+    """
+    Ensemble(path, mmap=True)
+
+    Solutions of an ensemble saved by save_ensemble.
+
+    Attributes
+    ----------
+    t: array (T,)
+    y: array (B,T,N), memory-mapped if mmap is True.
+    species: list
+
+    """
+
+    def __init__(self, path, mmap=True):
+
+        self.t, self.y, self.species = _read_arrays(path, mmap)
+
+    def __len__(self):
+        return self.y.shape[0]
+
+    def member(self, b):
+        """
+        Returns the b-th solution of the ensemble.
+        """
+
+        return Solution(self.t, self.y[b], self.species)
+
+    def select(self, species=None, t_min=None, t_max=None, members=None):
+        """
+        Returns a slice of the ensemble, reading only the requested part.
+
+        Parameters
+        ----------
+        species: list
+            Names of the species. All if not given.
+        t_min, t_max: float
+            Time window, extremes included. The whole grid if not given.
+        members: slice or list
+            Members of the ensemble. All if not given.
+
+        Returns
+        -------
+        The tuple (t, y), y having shape (B', T', N').
+
+        """
+
+        first, last = time_window(self.t, t_min, t_max)
+        y = self.y[members if members is not None else slice(None), first:last]
+
+        if species is not None:
+            y = y[..., [self.species.index(name) for name in species]]
+
+        return self.t[first:last], np.array(y)
+
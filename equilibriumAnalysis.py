@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:11:08 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Fixed points of the generalized Lotka Volterra system and their stability,
+computed directly instead of integrating to large times.
+
+A fixed point with the species of the subset S alive solves the linear
+system
+
+    A_eff[S,S] . n[S] = - c[S] * k[S]
+
+the other species being zero. It is feasible if all the populations in S
+are positive. Its stability is given by the eigenvalues of the Jacobian
+
+    J = diag(k + A_eff.n / c) + diag(n / c) . A_eff
+
+that for the species outside S reduce to their invasion rates
+k_j + (A_eff.n)_j / c_j, i.e. the per capita growth rates of a species
+introduced in small number.
+All the functions accept batches of systems: the last axes are the ones
+of the species, the leading ones are the batch.
+"""
+
+import itertools
+import numpy as np
+
+
+# Largest number of species for which all the subsets are searched, if
+# the size of the subsets is not limited.
+MAX_SUBSET_SPECIES = 16
+
+
+def solve_linear(M, b):
+    """
+    Solves M.x = b for a batch of systems. The members with a singular
+    matrix get NaN, instead of stopping the whole batch.
+
+    Parameters
+    ----------
+    M: array (...,N,N)
+    b: array (...,N)
+
+    """
+
+    try:
+        return np.linalg.solve(M, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        pass
+
+    x = np.full(b.shape, np.nan)
+    for i in np.ndindex(b.shape[:-1]):
+        try:
+            x[i] = np.linalg.solve(M[i], b[i])
+        except np.linalg.LinAlgError:
+            pass
+
+    return x
+
+
+def interior_equilibrium(k, c, A_eff):
+    """
+    Returns the fixed point with all the species alive. NaN if A_eff is
+    singular.
+
+    Parameters
+    ----------
+    k, c: arrays (...,N)
+    A_eff: array (...,N,N)
+        Effective interaction matrix, as returned by
+        glvEngine.effective_matrix.
+
+    """
+
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+
+    return solve_linear(np.asarray(A_eff, dtype=float), -c*k)
+
+
+def growth_rates(n, k, c, A_eff):
+    """
+    Returns the per capita growth rates k + A_eff.n / c at the state n.
+    At a fixed point they vanish for the species alive, and are the
+    invasion rates for the others.
+    """
+
+    n = np.asarray(n, dtype=float)
+
+    return k + np.einsum('...ij,...j->...i', A_eff, n)/c
+
+
+def jacobian_eigenvalues(n, k, c, A_eff):
+    """
+    Returns the eigenvalues (...,N) of the Jacobian of the system at the
+    state n, sorted by decreasing real part.
+    """
+
+    n = np.asarray(n, dtype=float)
+    A_eff = np.asarray(A_eff, dtype=float)
+
+    J = (n/c)[..., :, None] * A_eff
+    N = n.shape[-1]
+    J[..., np.arange(N), np.arange(N)] += growth_rates(n, k, c, A_eff)
+
+    eigenvalues = np.linalg.eigvals(J)
+    order = np.argsort(-eigenvalues.real, axis=-1)
+
+    return np.take_along_axis(eigenvalues, order, axis=-1)
+
+
+def subset_equilibria(k, c, A_eff, subsets):
+    """
+    Returns the fixed points with only the species of each subset alive.
+    Subsets of the same size are solved as a single batch.
+
+    Parameters
+    ----------
+    k, c: arrays (N,)
+    A_eff: array (N,N)
+    subsets: list
+        Each subset is a sequence of positions of species.
+
+    Returns
+    -------
+    array (len(subsets), N), zero outside each subset, NaN if the
+    subsystem is singular.
+
+    """
+
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A_eff = np.asarray(A_eff, dtype=float)
+
+    n = np.zeros((len(subsets), len(k)))
+
+    by_size = {}
+    for row, subset in enumerate(subsets):
+        by_size.setdefault(len(subset), []).append(row)
+
+    for size, rows in by_size.items():
+        if (size == 0):
+            continue
+        S = np.array([subsets[row] for row in rows], dtype=int)
+        M = A_eff[S[:, :, None], S[:, None, :]]
+        x = solve_linear(M, -(c*k)[S])
+        n[np.array(rows)[:, None], S] = x
+
+    return n
+
+
+def candidate_subsets(N, max_size=None):
+    """
+    Returns all the non-empty subsets of range(N) with at most max_size
+    elements, in order of increasing size.
+    Raises ValueError if they are too many to be searched.
+    """
+
+    if max_size is None:
+        if (N > MAX_SUBSET_SPECIES):
+            raise ValueError("Too many species for a search over all the subsets: give max_size.")
+        max_size = N
+
+    return [subset for size in range(1, min(max_size, N) + 1)
+            for subset in itertools.combinations(range(N), size)]
+
+
+class Equilibrium:
+    """
+    Equilibrium(species, n, k, c, A_eff, tol=0.)
+
+    A fixed point of the system and its stability.
+
+    Attributes
+    ----------
+    species: list
+        Names of all the species.
+    n: array (N,)
+        Populations at the fixed point. NaN if it does not exist.
+    alive: list
+        Names of the species with non-zero population.
+    feasible: bool
+        True if the populations of the species alive are all above tol.
+    eigenvalues: array (N,)
+        Eigenvalues of the Jacobian, sorted by decreasing real part.
+    stable: bool
+        True if all the eigenvalues have negative real part.
+    invasion: dict
+        {name: invasion rate} for the species that are not alive.
+    saturated: bool
+        True if no absent species can invade, i.e. all the invasion rates
+        are not positive.
+
+    """
+
+    def __init__(self, species, n, k, c, A_eff, tol=0.):
+
+        self.species = list(species)
+        self.n = np.asarray(n, dtype=float)
+
+        alive = ~(self.n == 0)
+        self.alive = [name for name, a in zip(self.species, alive) if a]
+
+        if np.any(np.isnan(self.n)):
+            self.feasible = False
+            self.eigenvalues = np.full(len(self.n), np.nan)
+            self.stable = False
+            self.invasion = {}
+            self.saturated = False
+            return
+
+        self.feasible = bool(np.all(self.n[alive] > tol))
+        self.eigenvalues = jacobian_eigenvalues(self.n, k, c, A_eff)
+        self.stable = bool(np.all(self.eigenvalues.real < 0))
+
+        rates = growth_rates(self.n, k, c, A_eff)
+        self.invasion = {name: rates[i].item()
+                         for i, name in enumerate(self.species) if not alive[i]}
+        self.saturated = all(rate <= 0 for rate in self.invasion.values())
+
+    def state(self):
+        """
+        Returns the dictionary {name: population}.
+        """
+
+        return dict(zip(self.species, self.n.tolist()))
+
+    def __repr__(self):
+
+        return ('Equilibrium(alive='+str(self.alive)+', feasible='
+                +str(self.feasible)+', stable='+str(self.stable)+')')
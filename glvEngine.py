@@ -0,0 +1,739 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:56:16 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+In-process integration of the generalized Lotka Volterra system.
+The right hand side is evaluated in vectorized form,
+
+    dn/dt = n * ( k + A_eff.n / c )
+
+directly on the arrays returned by Ecosystem.create_data, without any
+code generation.
+The interaction matrix can be either a dense array or a SciPy sparse
+matrix: in the latter case the cost of each evaluation scales with the 
+number of interactions instead of N**2.
+
+SciPy is imported on first use, so that importing this module is cheap.
+"""
+
+import sys
+import numpy as np
+
+
+# Maximum fraction of non-zero interactions, and minimum number of species,
+# for which the sparse storage is chosen automatically.
+SPARSE_DENSITY = 0.1
+SPARSE_MIN_SPECIES = 100
+
+# Default relative and absolute tolerances of odeint, used by all the
+# solvers unless given.
+RTOL = 1.49012e-8
+ATOL = 1.49012e-8
+
+
+def issparse(A):
+    """
+    Returns True if A is a SciPy sparse matrix. If scipy.sparse has not 
+    been imported yet A can not be sparse, so that it is not imported.
+
+    """
+
+    sparse = sys.modules.get('scipy.sparse')
+
+    return (sparse is not None) and sparse.issparse(A)
+
+
+def use_sparse(A):
+    """
+    Returns True if the interaction matrix A is large and sparse enough to 
+    be integrated in sparse form.
+
+    """
+
+    N = A.shape[0]
+    nnz = A.nnz if issparse(A) else np.count_nonzero(A)
+
+    return (N >= SPARSE_MIN_SPECIES) and (nnz <= SPARSE_DENSITY*N*N)
+
+
+def effective_matrix(A):
+    """
+    Returns the interaction matrix actually entering the equations.
+
+    As in the generated integrator, only the upper triangle of A (diagonal
+    included) is used: the lower triangle is taken as minus the transpose
+    of the upper one, so that the interactions are antisymmetric.
+
+    Parameters
+    ----------
+    A: array (N,N) or sparse matrix
+        Interaction matrix, as returned by Ecosystem.create_data.
+
+    Returns
+    -------
+    array (N,N), or CSR matrix if A is sparse.
+
+    """
+
+    if issparse(A):
+        import scipy.sparse as sp
+        return (sp.triu(A) - sp.triu(A, 1).T).tocsr()
+
+    A = np.asarray(A, dtype=float)
+
+    return np.triu(A) - np.triu(A, 1).T
+
+
+def diagonal_terms(k, K, c):
+    """
+    Returns the diagonal of the interaction matrix, computed from the 
+    parameters as a_ii = theta(k_i)*k_i*c_i/K_i.
+    Works on arrays of any shape.
+
+    """
+
+    k = np.asarray(k, dtype=float)
+
+    return (k > 0)*k*np.asarray(c, dtype=float)/np.asarray(K, dtype=float)
+
+
+def rhs(n, t, k, c, A_eff):
+    """
+    Right hand side of the system, in the signature required by odeint.
+
+    Parameters
+    ----------
+    n: array (N,)
+        Current populations.
+    t: float
+        Current time (the system is autonomous, so it is not used).
+    k: array (N,)
+        Growth rates.
+    c: array (N,)
+        Change rates.
+    A_eff: array (N,N)
+        Effective interaction matrix, see effective_matrix.
+
+    Returns
+    -------
+    array (N,)
+
+    """
+
+    return n * (k + A_eff.dot(n) / c)
+
+
+def rhs_jacobian(n, t, k, c, A_eff):
+    """
+    Analytic Jacobian of the right hand side,
+
+        J = diag( k + A_eff.n / c ) + diag( n / c ).A_eff
+
+    in the signature required by odeint.
+
+    Parameters
+    ----------
+    The same as rhs.
+
+    Returns
+    -------
+    array (N,N), J[i][j] being the derivative of the i-th equation with
+    respect to the j-th population. CSR matrix if A_eff is sparse.
+
+    """
+
+    if issparse(A_eff):
+        import scipy.sparse as sp
+        return (sp.diags(n / c).dot(A_eff) 
+                + sp.diags(k + A_eff.dot(n) / c)).tocsr()
+
+    J = (n / c)[:, None] * A_eff
+    J[np.diag_indices_from(J)] += k + A_eff.dot(n) / c
+
+    return J
+
+
+def dense_jacobian(n, t, k, c, A_eff):
+    """
+    The same as rhs_jacobian, always returned as a dense array as required
+    by odeint.
+
+    """
+
+    J = rhs_jacobian(n, t, k, c, A_eff)
+
+    return J.toarray() if issparse(J) else J
+
+
+def bandwidth(A_eff):
+    """
+    Returns the number of lower and upper non-zero diagonals of A_eff,
+    as the tuple (ml, mu).
+
+    """
+
+    i, j = A_eff.nonzero()
+    if (len(i) == 0):
+        return (0, 0)
+
+    return (max(int((i - j).max()), 0), max(int((j - i).max()), 0))
+
+
+class BandedJacobian:
+    """
+    BandedJacobian(A_eff, ml, mu)
+
+    Analytic Jacobian in the packed banded form required by odeint when
+    ml and mu are given: jac[i - j + mu][j] holds the derivative of the 
+    i-th equation with respect to the j-th population.
+    The band of A_eff is packed once, so that each evaluation costs
+    O(N*(ml+mu+1)) instead of O(N**2).
+
+    """
+
+    def __init__(self, A_eff, ml, mu):
+
+        N = A_eff.shape[0]
+        self.mu = mu
+
+        # rows[r][j] is the row of A_eff stored in jac[r][j]
+        self.rows = np.arange(-mu, ml + 1)[:, None] + np.arange(N)[None, :]
+        inside = (self.rows >= 0) & (self.rows < N)
+        self.rows = np.where(inside, self.rows, 0)
+
+        if issparse(A_eff):
+            A_eff = A_eff.tocoo()
+            nz = (A_eff.data != 0)
+            self.band = np.zeros(self.rows.shape)
+            self.band[A_eff.row[nz] - A_eff.col[nz] + mu, 
+                      A_eff.col[nz]] = A_eff.data[nz]
+        else:
+            cols = np.broadcast_to(np.arange(N), self.rows.shape)
+            self.band = np.where(inside, A_eff[self.rows, cols], 0.)
+
+    def __call__(self, n, t, k, c, A_eff):
+
+        jac = self.band * (n / c)[self.rows]
+        jac[self.mu] += k + A_eff.dot(n) / c
+
+        return jac
+
+
+def integrate(n0, t, k, c, A, jacobian=True, full_output=False, h0=0.,
+              rtol=None, atol=None, max_step=np.inf):
+    """
+    Integrates the system over the time grid t.
+
+    Parameters
+    ----------
+    n0: array (N,)
+        Initial conditions.
+    t: array (T,)
+        Time grid. The first value is the initial time.
+    k: array (N,)
+        Growth rates.
+    c: array (N,)
+        Change rates.
+    A: array (N,N) or sparse matrix
+        Interaction matrix, as returned by Ecosystem.create_data or 
+        Ecosystem.system_arrays.
+    jacobian: bool
+        If True the analytic Jacobian is given to the solver, in banded 
+        form when the interaction matrix is banded. If False the solver
+        estimates it by finite differences.
+        Since odeint only accepts dense or banded Jacobians, a sparse
+        Jacobian that is not banded is converted to a dense array.
+    full_output: bool
+        If True the dictionary with the counters of the solver is also
+        returned, as by odeint.
+    h0: float
+        Size of the first step, e.g. the last step of a previous 
+        integration that is being continued. If 0 it is chosen by the
+        solver.
+    rtol, atol: float
+        Relative and absolute tolerances. If None the ones of odeint,
+        RTOL and ATOL.
+    max_step: float
+        Maximum step size.
+
+    Returns
+    -------
+    array (T,N) with the populations at each time of the grid, and the
+    dictionary of the counters if full_output is True.
+
+    """
+
+    from scipy.integrate import odeint
+
+    n0 = np.asarray(n0, dtype=float)
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A_eff = effective_matrix(A)
+    options = {'full_output': full_output, 'h0': h0, 'rtol': rtol, 
+               'atol': atol, 'hmax': 0. if np.isinf(max_step) else max_step}
+
+    if not jacobian:
+        return odeint(rhs, n0, t, args=(k, c, A_eff), **options)
+
+    Dfun, ml, mu = solver_jacobian(A_eff)
+
+    return odeint(rhs, n0, t, args=(k, c, A_eff), Dfun=Dfun, ml=ml, mu=mu,
+                  **options)
+
+
+def solver_jacobian(A_eff):
+    """
+    Chooses the form of the analytic Jacobian given to LSODA.
+
+    Returns
+    -------
+    The tuple (Dfun, ml, mu): Dfun has the signature of rhs_jacobian, ml 
+    and mu are the bandwidths if Dfun returns the packed banded form, None
+    if it returns a dense array.
+
+    """
+
+    ml, mu = bandwidth(A_eff)
+
+    # The banded storage pays off only if the band is narrow enough.
+    if (2*(ml + mu + 1) <= A_eff.shape[0]):
+        return (BandedJacobian(A_eff, ml, mu), ml, mu)
+
+    return (dense_jacobian, None, None)
+
+
+def lsoda_steps(n0, t0, t_end, k, c, A_eff, jacobian=True, info=None,
+                rtol=None, atol=None, max_step=np.inf):
+    """
+    Steps a LSODA solver from t0 towards t_end, with the same tolerances
+    of odeint unless rtol and atol are given. The solver is yielded after
+    each step, so that its state (t, y, t_old and dense_output) can be
+    inspected between steps.
+    The caller must check solver.status, that is 'failed' if a step did
+    not succeed. In that case the generator stops.
+    If the dictionary info is given, the counters 'nfev', 'njev' and the 
+    list 'step_sizes' are accumulated into it.
+
+    """
+
+    from scipy.integrate import LSODA
+
+    options = {'rtol': RTOL if rtol is None else rtol, 
+               'atol': ATOL if atol is None else atol, 'max_step': max_step}
+    if jacobian:
+        Dfun, ml, mu = solver_jacobian(A_eff)
+        options['jac'] = lambda t, y: Dfun(y, t, k, c, A_eff)
+        options['lband'] = ml
+        options['uband'] = mu
+
+    solver = LSODA(lambda t, y: rhs(y, t, k, c, A_eff), t0, n0, t_end,
+                   **options)
+
+    if info is not None:
+        info.setdefault('nfev', 0)
+        info.setdefault('njev', 0)
+        info.setdefault('step_sizes', [])
+
+    try:
+        while (solver.status == 'running'):
+            solver.step()
+            if info is not None and not (solver.status == 'failed'):
+                info['step_sizes'].append(solver.t - solver.t_old)
+            yield solver
+    finally:
+        if info is not None:
+            info['nfev'] += solver.nfev
+            info['njev'] += solver.njev
+
+
+def integrate_chunks(n0, max_time, t_steps, k, c, A, chunk_steps, 
+                     jacobian=True, t0=0., info=None):
+    """
+    Integrates the system over the grid linspace(t0, max_time, t_steps),
+    yielding the solution in chunks of at most chunk_steps times.
+    A single LSODA solver is stepped along the whole horizon, so that its 
+    state (step size, order, Jacobian) is carried from a chunk to the 
+    next one, and the grid values are interpolated from its dense output.
+    Neither the grid nor the solution are ever held in memory as a whole.
+
+    Parameters
+    ----------
+    n0, k, c, A, jacobian:
+        The same as integrate.
+    max_time: float
+    t_steps: int
+    chunk_steps: int
+        Maximum number of times in each chunk.
+    t0: float
+        Initial time.
+    info: dict
+        If given, the counters of the solver are accumulated into it, as
+        by lsoda_steps.
+
+    Yields
+    ------
+    The tuples (t, y), t being an array (M,) of times of the grid and y the
+    array (M,N) of the populations at those times.
+
+    """
+
+    n0 = np.asarray(n0, dtype=float)
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A_eff = effective_matrix(A)
+
+    N = len(n0)
+    dt = (max_time - t0)/(t_steps - 1) if (t_steps > 1) else 0.
+
+    t_chunk = np.empty(chunk_steps)
+    y_chunk = np.empty((chunk_steps, N))
+    filled = 0
+    i = 0
+
+    def grid_rows(reached, solver):
+        # Moves the grid points up to 'reached' into the chunk, yielding
+        # the chunk each time it is full.
+        nonlocal filled, i
+        while (i < reached):
+            m = min(reached - i, chunk_steps - filled)
+            times = t0 + dt*np.arange(i, i + m)
+            if solver is None:
+                values = n0[:, None]
+            else:
+                times = np.minimum(times, max_time)
+                values = solver.dense_output()(times)
+            t_chunk[filled:filled + m] = times
+            y_chunk[filled:filled + m] = values.T
+            filled += m
+            i += m
+
+            if (filled == chunk_steps) or (i == t_steps):
+                yield t_chunk[:filled].copy(), y_chunk[:filled].copy()
+                filled = 0
+
+    yield from grid_rows(1, None)
+    if (t_steps == 1):
+        return
+
+    for solver in lsoda_steps(n0, t0, max_time, k, c, A_eff, jacobian, info):
+        if (solver.status == 'failed'):
+            raise RuntimeError("Integration failed at time "+str(solver.t)+".")
+
+        if (solver.status == 'finished'):
+            reached = t_steps
+        else:
+            reached = min(int(np.floor((solver.t - t0)/dt + 1e-9)) + 1, t_steps)
+
+        yield from grid_rows(reached, solver)
+
+
+def integrate_events(n0, t, k, c, A, extinction=None, steady_state=None,
+                     blow_up=None, stop=('steady_state', 'blow_up'), 
+                     jacobian=True, prune=False, info=None, rtol=None,
+                     atol=None, max_step=np.inf):
+    """
+    Integrates the system over the time grid t, as integrate, while 
+    looking for three kinds of events:
+        'extinction': a population falls below the threshold 'extinction';
+        'steady_state': the norm max|dn/dt| falls below 'steady_state';
+        'blow_up': a population exceeds 'blow_up', or the solver fails.
+    The time of an extinction or blow-up is located inside the step by
+    root finding on the dense output of the solver, the one of a steady
+    state is the end of the first step where it holds.
+    Events whose kind is in 'stop' end the integration: the grid is then
+    truncated at the time of the first of them. A divergence of the
+    solution (the solver fails, stalls or returns non finite values) always
+    ends it, at the last step, once recorded as a blow-up.
+
+    If prune is True, a species is removed from the system at the time of
+    its extinction, and the integration is restarted from that time with
+    the remaining species only, so that the cost of the following steps
+    scales with the number of species still alive. A removed species can
+    not recover, even if it would have grown again in the full system.
+
+    Parameters
+    ----------
+    n0, t, k, c, A, jacobian:
+        The same as integrate.
+    extinction, steady_state, blow_up: float
+        Thresholds of the events. Events without a threshold are not
+        looked for.
+    stop: tuple
+        Kinds of the events that stop the integration.
+    prune: bool
+        If True the extinct species are removed from the system. Their 
+        population is zero after the extinction. Requires 'extinction'.
+    info: dict
+        If given, the counters of the solver are accumulated into it, as
+        by lsoda_steps, with the number of 'restarts' due to pruning.
+    rtol, atol, max_step:
+        The same as integrate.
+
+    Returns
+    -------
+    The tuple (t, y, events). t and y are the grid and the solution, 
+    truncated if the integration stopped. events is the dictionary
+    {'extinction': {index: time}, 'steady_state': time, 'blow_up': time},
+    with only the events that happened: the index is the position of the
+    species in n0, and only its first extinction is recorded.
+
+    """
+
+    from scipy.optimize import brentq
+
+    n0 = np.asarray(n0, dtype=float)
+    t = np.asarray(t, dtype=float)
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A_eff = effective_matrix(A)
+
+    for kind in stop:
+        if not (kind in ('extinction', 'steady_state', 'blow_up')):
+            raise ValueError("Unknown event: "+str(kind)+".")
+    if prune and (extinction is None):
+        raise ValueError("Pruning requires an extinction threshold.")
+
+    if info is not None:
+        info.setdefault('nfev', 0)
+        info.setdefault('njev', 0)
+        info.setdefault('step_sizes', [])
+
+    N = len(n0)
+    events = {}
+    extinct = {}
+
+    # Species still in the system, and their arrays
+    active = np.arange(N)
+    k_a, c_a, A_a = k, c, A_eff
+
+    def full(y):
+        # Populations of all the species, zero for the removed ones.
+        if (len(active) == N):
+            return y
+        values = np.zeros((N,) + y.shape[1:])
+        values[active] = y
+        return values
+
+    def check(y_old, y, t_old, t_new, interp):
+        # Events in the step (t_old, t_new], as a list sorted by time.
+        found = []
+        if extinction is not None:
+            for i in np.flatnonzero(y < extinction):
+                if not (i in extinct):
+                    if (y_old is None) or not (y_old[i] > extinction):
+                        time = t_new
+                    else:
+                        time = brentq(lambda s: interp(s)[i] - extinction,
+                                      t_old, t_new)
+                    found.append((time, 'extinction', int(i)))
+        if (blow_up is not None) and not ('blow_up' in events):
+            if not np.all(np.isfinite(y)):
+                found.append((t_new, 'blow_up', None))
+            elif (y.max() > blow_up):
+                if (y_old is None) or (y_old.max() > blow_up):
+                    time = t_new
+                else:
+                    time = brentq(lambda s: interp(s).max() - blow_up,
+                                  t_old, t_new)
+                found.append((time, 'blow_up', None))
+        if steady_state is not None:
+            dndt = rhs(y[active], t_new, k_a, c_a, A_a)
+            if (np.abs(dndt).max(initial=0) < steady_state):
+                found.append((t_new, 'steady_state', None))
+        return sorted(found, key=lambda event: event[0])
+
+    def handle(found):
+        # Records the events in order, up to the first one that stops the
+        # integration or removes a species. Returns the tuple (action, 
+        # time, index), action being 'stop', 'prune' or None.
+        for time, kind, index in found:
+            if (kind == 'extinction'):
+                extinct[index] = time
+                events['extinction'] = extinct
+            elif not (kind in events):
+                events[kind] = time
+            if (kind in stop):
+                return ('stop', time, index)
+            if prune and (kind == 'extinction'):
+                return ('prune', time, index)
+        return (None, None, None)
+
+    rows = [n0[None, :]]
+    filled = 1
+    t_now = t[0]
+    y_now = n0
+
+    while True:
+        action, t_event, index = handle(check(None, full(y_now), t_now,
+                                              t_now, None))
+
+        if (action is None) and (t_now < t[-1]):
+            y_old = full(y_now)
+            for solver in lsoda_steps(y_now, t_now, t[-1], k_a, c_a, A_a, 
+                                      jacobian, info, rtol, atol, max_step):
+
+                # At a divergence the solver stops advancing, or steps on
+                # NaN: the integration ends at the last step, whatever stop.
+                if ((solver.status == 'failed') or (solver.t <= solver.t_old)
+                    or not np.all(np.isfinite(solver.y))):
+                    if blow_up is None:
+                        raise RuntimeError("Integration failed at time "
+                                           +str(solver.t)+".")
+                    handle([(solver.t, 'blow_up', None)])
+                    action = 'stop'
+                    break
+
+                dense = solver.dense_output()
+                interp = lambda s: full(dense(s))
+                y_new = full(solver.y)
+                action, t_event, index = handle(check(y_old, y_new, 
+                                                      solver.t_old, solver.t,
+                                                      interp))
+                y_old = y_new
+
+                t_end = solver.t if action is None else t_event
+                reached = int(np.searchsorted(t, t_end, 'right'))
+                if (solver.status == 'finished') and (action is None):
+                    reached = len(t)
+                if (reached > filled):
+                    rows.append(interp(np.minimum(t[filled:reached], 
+                                                  solver.t)).T)
+                    filled = reached
+
+                if (action == 'prune'):
+                    y_now = dense(t_event)
+                    t_now = t_event
+                if action is not None:
+                    break
+
+        if not (action == 'prune'):
+            break
+
+        # The extinct species is removed and the system restarted.
+        if info is not None:
+            info['restarts'] = info.get('restarts', 0) + 1
+        keep = ~(active == index)
+        active = active[keep]
+        y_now = y_now[keep]
+        k_a = k[active]
+        c_a = c[active]
+        A_a = A_eff[active][:, active]
+
+        if (len(active) == 0):
+            rows.append(np.zeros((len(t) - filled, N)))
+            filled = len(t)
+            break
+
+    return t[:filled], np.concatenate(rows), events
+
+
+def rhs_batch(y, t, k, c, A_eff):
+    """
+    Right hand side of B independent copies of the system, stacked in a
+    single state vector of length B*N, in the signature required by odeint.
+
+    Parameters
+    ----------
+    y: array (B*N,)
+        Current populations of all the members of the batch.
+    t: float
+        Current time (not used).
+    k: array (B,N)
+    c: array (B,N)
+    A_eff: array (B,N,N)
+
+    Returns
+    -------
+    array (B*N,)
+
+    """
+
+    n = y.reshape(k.shape)
+
+    return (n * (k + np.einsum('bij,bj->bi', A_eff, n) / c)).ravel()
+
+
+class BatchJacobian:
+    """
+    BatchJacobian(A_eff)
+
+    Analytic Jacobian of rhs_batch. Since the members of the batch are
+    independent, the Jacobian is block diagonal: it is given to odeint in 
+    packed banded form, with the band of the widest block.
+
+    """
+
+    def __init__(self, A_eff):
+
+        B, N, _ = A_eff.shape
+        self.ml, self.mu = bandwidth(np.any(A_eff != 0, axis=0))
+
+        # For the element jac[r][j]: member of the batch, row and column
+        # inside the block. Elements outside the block are masked.
+        j = np.arange(B*N)[None, :]
+        local_row = (j % N) + np.arange(-self.mu, self.ml + 1)[:, None]
+        self.inside = (local_row >= 0) & (local_row < N)
+        self.member = np.broadcast_to(j // N, local_row.shape)
+        self.row = np.where(self.inside, local_row, 0)
+        self.col = np.broadcast_to(j % N, local_row.shape)
+
+    def __call__(self, y, t, k, c, A_eff):
+
+        n = y.reshape(k.shape)
+
+        J = (n / c)[:, :, None] * A_eff
+        diag = np.arange(k.shape[1])
+        J[:, diag, diag] += k + np.einsum('bij,bj->bi', A_eff, n) / c
+
+        return np.where(self.inside, J[self.member, self.row, self.col], 0.)
+
+
+def integrate_batch(n0, t, k, c, A, jacobian=True):
+    """
+    Integrates B independent copies of the system at once, over the same
+    time grid t.
+
+    Parameters
+    ----------
+    n0: array (B,N)
+        Initial conditions.
+    t: array (T,)
+        Time grid. The first value is the initial time.
+    k: array (B,N)
+        Growth rates.
+    c: array (B,N)
+        Change rates.
+    A: array (B,N,N)
+        Interaction matrices, diagonal included.
+    jacobian: bool
+        If True the analytic Jacobian is given to the solver.
+
+    Returns
+    -------
+    array (B,T,N) with the populations of each member of the batch at each 
+    time of the grid.
+
+    """
+
+    from scipy.integrate import odeint
+
+    n0 = np.asarray(n0, dtype=float)
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A = np.asarray(A, dtype=float)
+    A_eff = np.triu(A) - np.swapaxes(np.triu(A, 1), 1, 2)
+
+    B, N = n0.shape
+
+    if jacobian:
+        Dfun = BatchJacobian(A_eff)
+        sol = odeint(rhs_batch, n0.ravel(), t, args=(k, c, A_eff), 
+                     Dfun=Dfun, ml=Dfun.ml, mu=Dfun.mu)
+    else:
+        sol = odeint(rhs_batch, n0.ravel(), t, args=(k, c, A_eff))
+
+    return np.ascontiguousarray(sol.reshape(len(t), B, N).transpose(1, 0, 2))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:23:34 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Choice of the integration method of the 'numpy' backend.
+
+    'lsoda': odeint, switching by itself between Adams (non-stiff) and
+             BDF (stiff) methods. The default.
+    'bdf', 'radau': implicit methods of SciPy, for stiff systems. They
+             accept the sparse Jacobian of a sparse system, so that the
+             cost of the linear algebra scales with the interactions.
+    'rk45', 'dop853': explicit Runge Kutta methods of SciPy, for non-stiff
+             systems. No Jacobian is evaluated.
+    'log': odeint on the logarithms of the populations,
+
+                 d log(n)/dt = k + A_eff.n / c
+
+             so that the populations can never become negative. The
+             tolerances apply to log(n), i.e. to the relative errors of
+             the populations. Species with zero population stay zero.
+    'auto': the method is chosen from a probe of the stiffness of the
+             system at the initial state, see choose_method.
+
+The methods of SciPy are stepped directly, and the solution at the times
+of the grid is evaluated from the dense output of each step, so that the
+grid does not limit the step sizes.
+"""
+
+import numpy as np
+
+import glvEngine
+
+
+METHODS = ('lsoda', 'bdf', 'radau', 'rk45', 'dop853', 'log')
+
+# Solver classes of scipy.integrate
+SOLVERS = {'bdf': 'BDF', 'radau': 'Radau', 'rk45': 'RK45', 'dop853': 'DOP853'}
+
+# Methods that use the Jacobian
+IMPLICIT = ('lsoda', 'bdf', 'radau', 'log')
+
+# Below this number of species 'auto' always chooses 'lsoda': the cost of
+# each step is dominated by the overhead of the solvers written in Python.
+PROBE_MIN_SPECIES = 50
+
+# Stiffness (see stiffness) above which a system is considered stiff,
+# i.e. an explicit method would need more than about a few hundreds steps
+# only to remain stable.
+STIFFNESS_LIMIT = 1000.
+
+# Minimum number of species for which 'auto' chooses 'bdf' with a sparse
+# Jacobian for a stiff system. Below, the dense LU of odeint is faster.
+SPARSE_BDF_MIN_SPECIES = 500
+
+# Largest number of species for which the eigenvalues are computed by the
+# stiffness probe. Above, they are bounded by the Gershgorin discs.
+EIGEN_MAX_SPECIES = 200
+
+
+def log_rhs(u, t, k, c, A_eff):
+    """
+    Right hand side of the system for u = log(n).
+    """
+
+    return k + A_eff.dot(np.exp(u)) / c
+
+
+def log_jacobian(u, t, k, c, A_eff):
+    """
+    Dense Jacobian of log_rhs, J[i][j] = A_eff[i][j] * n[j] / c[i].
+    """
+
+    n = np.exp(u)
+
+    if glvEngine.issparse(A_eff):
+        import scipy.sparse as sp
+        return (sp.diags(1 / c).dot(A_eff).dot(sp.diags(n))).toarray()
+
+    return A_eff * n[None, :] / c[:, None]
+
+
+def integrate_log(n0, t, k, c, A_eff, jacobian=True, rtol=None, atol=None,
+                  max_step=np.inf, h0=0.):
+    """
+    Integrates the logarithms of the populations with odeint.
+
+    Returns
+    -------
+    The tuple (y, info): the array (T,N) of the populations and the full
+    output of odeint.
+
+    """
+
+    from scipy.integrate import odeint
+
+    if np.any(n0 < 0):
+        raise ValueError("The 'log' method requires non negative populations.")
+
+    alive = np.flatnonzero(n0 > 0)
+    if glvEngine.issparse(A_eff):
+        A_alive = A_eff.tocsr()[alive][:, alive]
+    else:
+        A_alive = A_eff[np.ix_(alive, alive)]
+
+    u, info = odeint(log_rhs, np.log(n0[alive]), t,
+                     args=(k[alive], c[alive], A_alive),
+                     Dfun=log_jacobian if jacobian else None,
+                     full_output=True, h0=h0, rtol=rtol, atol=atol,
+                     hmax=0. if np.isinf(max_step) else max_step)
+
+    y = np.zeros((len(t), len(n0)))
+    y[:, alive] = np.exp(u)
+
+    return y, info
+
+
+def integrate_ivp(n0, t, k, c, A_eff, method, jacobian=True, rtol=None,
+                  atol=None, max_step=np.inf, h0=0., info=None):
+    """
+    Integrates the system over the grid t with a solver of SciPy, stepped
+    directly. The values at the times of the grid come from the dense
+    output of the steps that contain them.
+    If the dictionary info is given, the counters 'nfev', 'njev' and the
+    list 'step_sizes' are accumulated into it, as by glvEngine.lsoda_steps.
+
+    Returns
+    -------
+    array (T,N)
+
+    """
+
+    import scipy.integrate
+
+    options = {'rtol': glvEngine.RTOL if rtol is None else rtol,
+               'atol': glvEngine.ATOL if atol is None else atol,
+               'max_step': max_step, 'first_step': h0 if (h0 > 0) else None}
+    if jacobian and (method in IMPLICIT):
+        options['jac'] = lambda time, n: glvEngine.rhs_jacobian(n, time, k,
+                                                                c, A_eff)
+
+    y = np.empty((len(t), len(n0)))
+    y[0] = n0
+    if (len(t) == 1):
+        return y
+
+    solver = getattr(scipy.integrate, SOLVERS[method])(
+                 lambda time, n: glvEngine.rhs(n, time, k, c, A_eff),
+                 t[0], n0, t[-1], **options)
+
+    step_sizes = []
+    i = 1
+    while (solver.status == 'running'):
+        solver.step()
+        if (solver.status == 'failed'):
+            raise RuntimeError("Integration failed at time "+str(solver.t)+".")
+        step_sizes.append(solver.t - solver.t_old)
+
+        if (solver.status == 'finished'):
+            reached = len(t)
+        else:
+            reached = int(np.searchsorted(t, solver.t, 'right'))
+        if (reached > i):
+            times = np.minimum(t[i:reached], solver.t)
+            y[i:reached] = solver.dense_output()(times).T
+            i = reached
+
+    if info is not None:
+        info['nfev'] = info.get('nfev', 0) + solver.nfev
+        info['njev'] = info.get('njev', 0) + solver.njev
+        info.setdefault('step_sizes', []).extend(step_sizes)
+
+    return y
+
+
+def stiffness(n0, t, k, c, A_eff):
+    """
+    Probe of the stiffness of the system at the initial state: the largest
+    modulus of the eigenvalues of the Jacobian with negative real part,
+    times the length of the time span. An explicit method needs about a
+    third of this number of steps to remain stable.
+    Above EIGEN_MAX_SPECIES species the eigenvalues are bounded by the
+    Gershgorin discs of the Jacobian, which can only overestimate it.
+
+    """
+
+    J = glvEngine.rhs_jacobian(n0, t[0], k, c, A_eff)
+    span = t[-1] - t[0]
+
+    if (len(n0) <= EIGEN_MAX_SPECIES):
+        J = J.toarray() if glvEngine.issparse(J) else J
+        eigenvalues = np.linalg.eigvals(J)
+        decaying = np.abs(eigenvalues[eigenvalues.real < 0])
+        return float(decaying.max() if len(decaying) else 0.) * span
+
+    diagonal = J.diagonal()
+    radii = np.asarray(abs(J).sum(axis=1)).ravel() - np.abs(diagonal)
+    reach = (diagonal - radii) < 0
+
+    return float((np.abs(diagonal[reach]) + radii[reach]).max(initial=0.)
+                 * span)
+
+
+def choose_method(n0, t, k, c, A_eff, rtol=None):
+    """
+    Chooses the method of 'auto':
+        'lsoda' for less than PROBE_MIN_SPECIES species;
+        'dop853' (or 'rk45' if rtol is above 1e-6) if the stiffness is
+        below STIFFNESS_LIMIT;
+        otherwise 'bdf' if the Jacobian is sparse, not banded and with at
+        least SPARSE_BDF_MIN_SPECIES species, so that it is factorized in
+        sparse form, 'lsoda' if not.
+
+    Returns
+    -------
+    The tuple (method, stiffness), stiffness being None if not probed.
+
+    """
+
+    N = len(n0)
+    if (N < PROBE_MIN_SPECIES):
+        return 'lsoda', None
+
+    probe = stiffness(n0, t, k, c, A_eff)
+
+    if (probe <= STIFFNESS_LIMIT):
+        return ('rk45' if (rtol is not None) and (rtol > 1e-6)
+                else 'dop853'), probe
+
+    if glvEngine.issparse(A_eff) and (N >= SPARSE_BDF_MIN_SPECIES):
+        ml, mu = glvEngine.bandwidth(A_eff)
+        if (2*(ml + mu + 1) > N):
+            return 'bdf', probe
+
+    return 'lsoda', probe
+
+
+def integrate(n0, t, k, c, A, method='lsoda', jacobian=True, rtol=None,
+              atol=None, max_step=np.inf, h0=0., stats=None):
+    """
+    Integrates the system over the time grid t with the given method.
+
+    Parameters
+    ----------
+    n0, t, k, c, A, jacobian, h0, rtol, atol, max_step:
+        The same as glvEngine.integrate.
+    method: string
+        One of METHODS, or 'auto'.
+    stats: SolveStats
+        If given, the counters of the solver are added to it. With 'auto'
+        the method chosen and the stiffness probed are in its 'extra'.
+
+    Returns
+    -------
+    array (T,N)
+
+    """
+
+    if not ((method in METHODS) or (method == 'auto')):
+        raise ValueError("Unknown method: "+str(method)+".")
+
+    n0 = np.asarray(n0, dtype=float)
+    t = np.asarray(t, dtype=float)
+    k = np.asarray(k, dtype=float)
+    c = np.asarray(c, dtype=float)
+
+    if (method == 'auto'):
+        method, probe = choose_method(n0, t, k, c,
+                                      glvEngine.effective_matrix(A), rtol)
+        if stats is not None:
+            stats.extra['method'] = method
+            stats.extra['stiffness'] = probe
+
+    if (method == 'lsoda'):
+        y, info = glvEngine.integrate(n0, t, k, c, A, jacobian, True, h0,
+                                      rtol, atol, max_step)
+    elif (method == 'log'):
+        y, info = integrate_log(n0, t, k, c, glvEngine.effective_matrix(A),
+                                jacobian, rtol, atol, max_step, h0)
+    else:
+        info = {}
+        y = integrate_ivp(n0, t, k, c, glvEngine.effective_matrix(A), method,
+                          jacobian, rtol, atol, max_step, h0, info)
+        if stats is not None:
+            stats.add_steps(info['nfev'], info['njev'], info['step_sizes'])
+        return y
+
+    if stats is not None:
+        stats.add_odeint(info, t)
+
+    return y
@@ -18,12 +18,12 @@ N = len(k)
 A = []
 for i in (range(N)):
     A.append( list(data['A_row'+str(i)]) )
-def system (y, t, k0,k1,K0,K1,c0,c1,A00,A01,A11):
+def system (y, t, k0,k1,K0,K1,c0,c1,A0_0,A0_1,A1_1):
 
     n0,n1 = y
 
-    dn0dt = k0*n0 + A00*n0*n0/c0 + A01*n0*n1/c0
-    dn1dt = k1*n1 + A11*n1*n1/c1 - A01*n1*n0/c1
+    dn0dt = k0*n0 + A0_0*n0*n0/c0 + A0_1*n0*n1/c0
+    dn1dt = k1*n1 + A1_1*n1*n1/c1 - A0_1*n1*n0/c1
 
     dydt = [dn0dt,dn1dt]
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:13:04 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Integration of the generalized Lotka Volterra system with the right hand
+side and the Jacobian compiled by Numba ('numba' backend).
+For small and medium N the cost of odeint is dominated by the overhead of
+each call of the right hand side: the compiled kernels are plain loops
+without any temporary array, so that each call costs little more than the
+arithmetic itself.
+
+Numba is optional. If it is not installed, AVAILABLE is False and
+integrate falls back to glvEngine.integrate. It is imported only when the
+kernels are compiled for the first time, since its import is slow.
+"""
+
+import importlib.util
+import numpy as np
+
+import glvEngine
+
+
+AVAILABLE = importlib.util.find_spec('numba') is not None
+
+
+# Kernels. They are valid Python, so that they can be checked without
+# Numba, and are compiled by _compiled when it is available.
+
+def dense_rhs(n, t, k, c, A_eff):
+
+    N = n.shape[0]
+    dndt = np.empty(N)
+    for i in range(N):
+        s = 0.
+        for j in range(N):
+            s += A_eff[i, j] * n[j]
+        dndt[i] = n[i] * (k[i] + s / c[i])
+
+    return dndt
+
+
+def dense_jac(n, t, k, c, A_eff):
+
+    N = n.shape[0]
+    J = np.empty((N, N))
+    for i in range(N):
+        s = 0.
+        for j in range(N):
+            s += A_eff[i, j] * n[j]
+            J[i, j] = n[i] * A_eff[i, j] / c[i]
+        J[i, i] += k[i] + s / c[i]
+
+    return J
+
+
+def csr_rhs(n, t, k, c, indptr, indices, data):
+
+    N = n.shape[0]
+    dndt = np.empty(N)
+    for i in range(N):
+        s = 0.
+        for p in range(indptr[i], indptr[i+1]):
+            s += data[p] * n[indices[p]]
+        dndt[i] = n[i] * (k[i] + s / c[i])
+
+    return dndt
+
+
+def csr_jac(n, t, k, c, indptr, indices, data):
+
+    N = n.shape[0]
+    J = np.zeros((N, N))
+    for i in range(N):
+        s = 0.
+        for p in range(indptr[i], indptr[i+1]):
+            j = indices[p]
+            s += data[p] * n[j]
+            J[i, j] += n[i] * data[p] / c[i]
+        J[i, i] += k[i] + s / c[i]
+
+    return J
+
+
+KERNELS = {'dense': (dense_rhs, dense_jac), 'csr': (csr_rhs, csr_jac)}
+
+# Compiled kernels, filled on first use.
+_jitted = {}
+
+
+def _compiled(kind):
+    """
+    Returns the compiled pair (rhs, jac) of the kind 'dense' or 'csr'.
+    The compiled code is cached on disk by Numba, so that it is built once.
+    """
+
+    if not (kind in _jitted):
+        import numba
+        _jitted[kind] = tuple(numba.njit(cache=True)(f) for f in KERNELS[kind])
+
+    return _jitted[kind]
+
+
+def integrate(n0, t, k, c, A, jacobian=True, full_output=False, h0=0.,
+              rtol=None, atol=None, max_step=np.inf):
+    """
+    Integrates the system with the compiled kernels. The parameters and the
+    result are the same of glvEngine.integrate, that is used instead if
+    Numba is not installed.
+    A sparse interaction matrix is given to the kernels in CSR form, so
+    that each call scales with the number of interactions. The Jacobian is
+    always dense.
+
+    """
+
+    if not AVAILABLE:
+        return glvEngine.integrate(n0, t, k, c, A, jacobian, full_output, h0,
+                                   rtol, atol, max_step)
+
+    from scipy.integrate import odeint
+
+    n0 = np.asarray(n0, dtype=float)
+    k = np.ascontiguousarray(k, dtype=float)
+    c = np.ascontiguousarray(c, dtype=float)
+    A_eff = glvEngine.effective_matrix(A)
+
+    if glvEngine.issparse(A_eff):
+        A_eff = A_eff.tocsr()
+        f, jac = _compiled('csr')
+        args = (k, c, A_eff.indptr, A_eff.indices,
+                np.ascontiguousarray(A_eff.data, dtype=float))
+    else:
+        f, jac = _compiled('dense')
+        args = (k, c, np.ascontiguousarray(A_eff, dtype=float))
+
+    return odeint(f, n0, t, args=args, Dfun=jac if jacobian else None,
+                  full_output=full_output, h0=h0, rtol=rtol, atol=atol,
+                  hmax=0. if np.isinf(max_step) else max_step)
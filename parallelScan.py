@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:58:00 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Parallel parameter scans. Each point of the scan is an independent
+integration, run in memory by a pool of worker processes that share
+nothing: every worker receives its own copy of the system arrays once,
+then only the parameters changed by each point travel between processes.
+
+A point is a dictionary {(attribute, key): value}, where attribute is one
+of 'InitialCond', 'GrowthRate', 'CarrCap', 'ChangeRate' (key is the
+species' name) or 'intMatrix' (key is the tuple (name1, name2)).
+"""
+
+import itertools
+import multiprocessing
+import numpy as np
+import glvEngine
+from LVsolution import Solution
+
+
+PARAMETERS = ('InitialCond', 'GrowthRate', 'CarrCap', 'ChangeRate')
+
+
+def grid_points(spec):
+    """
+    Returns the list of the points of a regular grid.
+
+    Parameters
+    ----------
+    spec: dict
+        {(attribute, key): values}. The grid is the cartesian product of
+        all the lists of values, the last entry of spec varying fastest.
+
+    Returns
+    -------
+    list of dict
+
+    """
+
+    keys = list(spec.keys())
+
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[spec[key] for key in keys])]
+
+
+def random_points(ranges, n_samples, seed=None):
+    """
+    Returns a list of points sampled uniformly at random.
+
+    Parameters
+    ----------
+    ranges: dict
+        {(attribute, key): (low, high)}.
+    n_samples: int
+        Number of points.
+    seed: int
+        Seed of the random generator. The same seed gives the same points.
+
+    Returns
+    -------
+    list of dict
+
+    """
+
+    rng = np.random.default_rng(seed)
+    keys = list(ranges.keys())
+    samples = {key: rng.uniform(ranges[key][0], ranges[key][1], n_samples)
+               for key in keys}
+
+    return [{key: float(samples[key][i]) for key in keys}
+            for i in range(n_samples)]
+
+
+# Copy of the system owned by each worker process, set by _init_worker.
+_worker_system = None
+
+
+def _init_worker(system):
+
+    global _worker_system
+    _worker_system = system
+
+
+def apply_point(system, point):
+    """
+    Returns the arrays (n0, k, K, c, A) of the system, modified according
+    to the point. The diagonal of A is recomputed from the new parameters.
+
+    Parameters
+    ----------
+    system: tuple
+        (index, n0, k, K, c, A), index being the dictionary {name: position}.
+    point: dict
+        {(attribute, key): value}.
+
+    """
+
+    index = system[0]
+    arrays = [np.array(x, dtype=float) for x in system[1:]]
+
+    for (attribute, key), value in point.items():
+        if (attribute == 'intMatrix'):
+            arrays[4][index[key[0]], index[key[1]]] = value
+        elif attribute in PARAMETERS:
+            arrays[PARAMETERS.index(attribute)][index[key]] = value
+        else:
+            raise KeyError("Unknown parameter: "+str(attribute)+".")
+
+    n0, k, K, c, A = arrays
+    A[np.diag_indices_from(A)] = glvEngine.diagonal_terms(k, K, c)
+
+    return n0, k, K, c, A
+
+
+def _solve_point(task):
+
+    point, t, jacobian = task
+    n0, k, K, c, A = apply_point(_worker_system, point)
+
+    return glvEngine.integrate(n0, t, k, c, A, jacobian)
+
+
+class ParallelScan:
+    """
+    ParallelScan(ecosystem, processes=None, chunksize=1)
+
+    Runs independent integrations of variants of an Ecosystem on a pool
+    of processes.
+
+    ecosystem: Ecosystem
+        The system to be scanned. Its current status is copied when the
+        scan is created, so that later changes do not affect it.
+    processes: int
+        Number of worker processes. If None, all the available cores are
+        used. With 1, the points are solved in the current process.
+    chunksize: int
+        Number of points sent to a worker at once.
+
+    """
+
+    def __init__(self, ecosystem, processes=None, chunksize=1):
+
+        N, names, n0, k, K, c, A = ecosystem.create_data()
+        index = {name: i for i, name in enumerate(names)}
+
+        self.species = list(names)
+        self.system = (index, np.array(n0, dtype=float),
+                       np.array(k, dtype=float), np.array(K, dtype=float),
+                       np.array(c, dtype=float), np.array(A, dtype=float))
+        self.processes = processes
+        self.chunksize = chunksize
+
+    def run(self, points, max_time=20, t_steps=2**7+1, jacobian=True):
+        """
+        Solves the system at every point.
+
+        Parameters
+        ----------
+        points: list of dict
+            As returned by grid_points or random_points.
+        max_time: float
+        t_steps: int
+            Time grid, the same as Ecosystem.solve.
+        jacobian: bool
+            If True the analytic Jacobian is given to the solver.
+
+        Yields
+        ------
+        The tuples (i, point, solution), solution being a Solution
+        object. Results are yielded as soon as they are ready, always
+        in the order of points.
+
+        """
+
+        t = np.linspace(0, max_time, t_steps)
+        tasks = [(point, t, jacobian) for point in points]
+
+        if (self.processes == 1):
+            _init_worker(self.system)
+            for i, task in enumerate(tasks):
+                yield i, task[0], Solution(t, _solve_point(task), self.species)
+            return
+
+        with multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                  initargs=(self.system,)) as pool:
+            results = pool.imap(_solve_point, tasks, self.chunksize)
+            for i, solution in enumerate(results):
+                yield i, points[i], Solution(t, solution, self.species)
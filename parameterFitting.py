@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:27:32 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Fit of the parameters of the system to observed time series of the
+populations, by nonlinear least squares.
+
+The residuals are the differences between the model and the observations,
+divided by their uncertainties sigma. Their Jacobian with respect to the
+free parameters is given exactly by the forward sensitivities of the
+module sensitivityAnalysis, computed in the same integration as the
+model, so that each iteration costs a single integration instead of one
+for each parameter. Everything stays in memory: the system arrays are
+modified as the points of parallelScan.
+
+Several starts can be run on a pool of processes: the first one from the
+current parameters of the system, the others from random points inside
+the bounds. The best fit is reported, with the standard errors and the
+correlations of the parameters estimated from the Jacobian at the
+optimum.
+"""
+
+import multiprocessing
+import warnings
+import numpy as np
+
+import parallelScan
+import sensitivityAnalysis
+from LVsolution import Solution
+
+
+# Residual given to the optimizer where the model can not be computed,
+# e.g. when a population blows up.
+PENALTY = 1e6
+
+# Attributes that must be positive: their lower bound is 0 by default.
+POSITIVE = ('InitialCond', 'CarrCap', 'ChangeRate')
+
+
+def observation_arrays(names, observations, sigma=None):
+    """
+    Converts the observations into arrays.
+
+    Parameters
+    ----------
+    names: list
+        Names of all the species.
+    observations: dict or array
+        {name: array (T,)} for the species observed, or array (T,N) with
+        all the species in the order of names. NaN are missing values.
+    sigma: float or dict
+        Uncertainty of the observations, for all the species or as
+        {name: float or array (T,)}. 1 if not given.
+
+    Returns
+    -------
+    The tuple (columns, Y, sigma): the positions (M,) of the species
+    observed, and the arrays (T,M) of their observations and
+    uncertainties.
+
+    """
+
+    if isinstance(observations, dict):
+        for name in observations:
+            if not (name in names):
+                raise TypeError("""Species not found.""")
+        observed = list(observations)
+        Y = np.column_stack([np.asarray(observations[name], dtype=float)
+                             for name in observed])
+    else:
+        Y = np.asarray(observations, dtype=float)
+        if not ((Y.ndim == 2) and (Y.shape[1] == len(names))):
+            raise ValueError("The observations must have shape (T,N), N being the number of species.")
+        observed = list(names)
+
+    columns = np.array([names.index(name) for name in observed], dtype=int)
+
+    if sigma is None:
+        sigma = 1.
+    if isinstance(sigma, dict):
+        sigma = np.column_stack([np.broadcast_to(
+                                     np.asarray(sigma.get(name, 1.),
+                                                dtype=float), Y.shape[:1])
+                                 for name in observed])
+
+    return columns, Y, np.broadcast_to(np.asarray(sigma, dtype=float),
+                                       Y.shape)
+
+
+class FitProblem:
+    """
+    FitProblem(system, parameters, t, rows, columns, Y, sigma, rtol=None,
+               atol=None)
+
+    Residuals of the observations and their Jacobian, as functions of the
+    values x of the free parameters.
+
+    system: tuple
+        (index, n0, k, K, c, A), as the system of parallelScan.
+    parameters: list
+        Free parameters, as tuples (attribute, key).
+    t: array
+        Time grid of the integration, starting from 0.
+    rows: array (T,)
+        Positions of the times of the observations in t.
+    columns, Y, sigma:
+        As returned by observation_arrays.
+
+    """
+
+    def __init__(self, system, parameters, t, rows, columns, Y, sigma,
+                 rtol=None, atol=None):
+
+        self.system = system
+        self.parameters = list(parameters)
+        self.t = t
+        self.rows = rows
+        self.columns = columns
+        self.Y = Y
+        self.sigma = sigma
+        self.mask = ~np.isnan(Y)
+        self.rtol = rtol
+        self.atol = atol
+
+        index = system[0]
+        self.indexed = [(attribute, (index[key[0]], index[key[1]])
+                         if (attribute == 'intMatrix') else index[key])
+                        for attribute, key in self.parameters]
+
+        self._x = None
+
+    def evaluate(self, x):
+        """
+        Integrates the model and its sensitivities at x.
+
+        Returns
+        -------
+        The tuple (y, r, J): the populations (T,N) over t, the residuals
+        (m,) and their Jacobian (m,P), m being the number of observations.
+
+        """
+
+        if (self._x is not None) and np.array_equal(x, self._x):
+            return self._result
+
+        point = dict(zip(self.parameters, x))
+        n0, k, K, c, A = parallelScan.apply_point(self.system, point)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            with np.errstate(all='ignore'):
+                y, S = sensitivityAnalysis.forward_sensitivity(n0, self.t, k,
+                                             K, c, A, self.indexed,
+                                             self.rtol, self.atol)
+
+        model = y[self.rows][:, self.columns]
+        r = ((model - self.Y)/self.sigma)[self.mask]
+        J = (S[self.rows][:, self.columns]
+             / self.sigma[:, :, None])[self.mask]
+
+        failed = ~np.isfinite(r)
+        r[failed] = PENALTY
+        J[~np.isfinite(J)] = 0.
+
+        self._x = np.array(x)
+        self._result = (y, r, J)
+
+        return self._result
+
+    def residuals(self, x):
+        return self.evaluate(x)[1]
+
+    def jacobian(self, x):
+        return self.evaluate(x)[2]
+
+    def solve(self, x0, lower, upper, loss='linear', max_nfev=None):
+        """
+        Runs the least squares optimization from x0.
+
+        Returns
+        -------
+        The OptimizeResult of scipy.optimize.least_squares.
+
+        """
+
+        from scipy.optimize import least_squares
+
+        return least_squares(self.residuals, x0, jac=self.jacobian,
+                             bounds=(lower, upper), method='trf',
+                             x_scale='jac', loss=loss, max_nfev=max_nfev)
+
+
+def start_points(x, lower, upper, starts, spread=0.5, seed=None):
+    """
+    Returns the array (starts,P) of the starting points: the first is x,
+    the others are drawn uniformly between finite bounds, or as x times a
+    log-normal factor of width spread (a normal deviate of width spread if
+    x is zero) otherwise. All are clipped inside the bounds.
+    """
+
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=float)
+    points = np.empty((starts, len(x)))
+    points[0] = x
+
+    finite = np.isfinite(lower) & np.isfinite(upper)
+    for s in range(1, starts):
+        scaled = np.where(x == 0, rng.normal(0, spread, len(x)),
+                          x*rng.lognormal(0, spread, len(x)))
+        uniform = rng.uniform(np.where(finite, lower, 0),
+                              np.where(finite, upper, 1))
+        points[s] = np.where(finite, uniform, scaled)
+
+    return np.clip(points, lower, upper)
+
+
+# Problem owned by each worker process, set by _init_worker.
+_worker_problem = None
+
+
+def _init_worker(problem):
+
+    global _worker_problem
+    _worker_problem = problem
+
+
+def _fit_start(task):
+
+    x0, lower, upper, loss, max_nfev = task
+    result = _worker_problem.solve(x0, lower, upper, loss, max_nfev)
+
+    return {'x0': x0, 'x': result.x, 'cost': float(result.cost),
+            'success': bool(result.success), 'message': result.message,
+            'nfev': int(result.nfev), 'njev': int(result.njev or 0),
+            'active': result.active_mask}
+
+
+class FitResult:
+    """
+    FitResult(problem, best, starts)
+
+    Result of Ecosystem.fit.
+
+    Attributes
+    ----------
+    parameters: dict
+        {(attribute, key): fitted value}.
+    standard_errors: dict
+        {(attribute, key): standard error}, from the covariance estimate
+        s**2 (J^T.J)^-1, s**2 being the residual variance.
+    covariance, correlation: arrays (P,P)
+    cost: float
+        Half the sum of the squared residuals at the optimum.
+    rmse: float
+        Root mean square of the residuals.
+    dof: int
+        Number of observations minus number of parameters.
+    singular_values: array
+        Singular values of the Jacobian of the residuals. Values close to
+        zero reveal combinations of parameters that the observations do
+        not determine.
+    condition: float
+        Ratio of the largest and the smallest singular value.
+    active: list
+        Parameters that ended on one of their bounds.
+    success: bool
+    message: string
+    nfev, njev: int
+        Evaluations of the residuals and of the Jacobian, over all the
+        starts.
+    starts: list
+        For each start, the dictionary with its starting point 'x0', its
+        result 'x', 'cost' and 'success', in the order of the starts.
+    residuals: array (m,)
+    solution: Solution
+        Fitted model at the times of the observations (and at time 0).
+
+    Methods
+    -------
+    apply(ecosystem)
+
+    """
+
+    def __init__(self, problem, best, starts, names):
+
+        y, r, J = problem.evaluate(best['x'])
+        m, P = J.shape
+
+        self.parameters = dict(zip(problem.parameters, best['x'].tolist()))
+        self.residuals = r
+        self.cost = float(0.5*np.sum(r**2))
+        self.rmse = float(np.sqrt(np.mean(r**2))) if m else np.nan
+        self.dof = m - P
+
+        self.singular_values = np.linalg.svd(J, compute_uv=False)
+        with np.errstate(divide='ignore'):
+            self.condition = float(self.singular_values[0]
+                                   / self.singular_values[-1]) \
+                             if len(self.singular_values) else np.nan
+
+        variance = 2*self.cost/self.dof if (self.dof > 0) else np.nan
+        self.covariance = variance*np.linalg.pinv(J.T.dot(J))
+        errors = np.sqrt(np.abs(np.diag(self.covariance)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.correlation = self.covariance/np.outer(errors, errors)
+        self.standard_errors = dict(zip(problem.parameters, errors.tolist()))
+
+        self.active = [parameter for parameter, a
+                       in zip(problem.parameters, best['active']) if a]
+        self.success = best['success']
+        self.message = best['message']
+        self.nfev = sum(s['nfev'] for s in starts)
+        self.njev = sum(s['njev'] for s in starts)
+        self.starts = [{key: s[key] for key in ('x0', 'x', 'cost', 'success')}
+                       for s in starts]
+        self.solution = Solution(problem.t, y, names)
+
+    def apply(self, ecosystem):
+        """
+        Sets the fitted parameters into the Ecosystem.
+        """
+
+        setters = {'InitialCond': ecosystem.setInitialCond,
+                   'GrowthRate': ecosystem.setGrowthRate,
+                   'CarrCap': ecosystem.setCarrCap,
+                   'ChangeRate': ecosystem.setChangeRate}
+
+        for (attribute, key), value in self.parameters.items():
+            if (attribute == 'intMatrix'):
+                ecosystem.setInteraction(key[0], key[1], value)
+            else:
+                setters[attribute](key, value)
+
+    def __repr__(self):
+
+        return ('FitResult(cost='+format(self.cost, '.6g')+', rmse='
+                +format(self.rmse, '.6g')+', success='+str(self.success)+')')
+
+
+def fit(system, names, parameters, t, rows, observations, bounds=None,
+        signs=None, sigma=None, starts=1, processes=None, spread=0.5,
+        seed=None, loss='linear', rtol=None, atol=None, max_nfev=None):
+    """
+    Fits the free parameters of the system to the observations. See
+    Ecosystem.fit for the parameters.
+
+    Returns
+    -------
+    FitResult
+
+    """
+
+    index, n0, k, K, c, A = system
+    columns, Y, sigma = observation_arrays(names, observations, sigma)
+    if not (len(Y) == len(rows)):
+        raise ValueError("The observations must have a row for each time.")
+
+    # Current values, lower and upper bounds of the free parameters
+    arrays = {'InitialCond': n0, 'GrowthRate': k, 'CarrCap': K,
+              'ChangeRate': c}
+    x = []
+    lower = []
+    upper = []
+    bounds = {} if bounds is None else bounds
+    for parameter in parameters:
+        attribute, key = parameter
+        if (attribute == 'intMatrix'):
+            value = A[index[key[0]], index[key[1]]]
+        elif attribute in arrays:
+            value = arrays[attribute][index[key]]
+        else:
+            raise KeyError("Unknown parameter: "+str(attribute)+".")
+        low, high = bounds.get(parameter,
+                               (0. if attribute in POSITIVE else -np.inf,
+                                np.inf))
+
+        sign = 0
+        if (signs == 'keep') and (attribute == 'intMatrix'):
+            sign = np.sign(value)
+        elif isinstance(signs, dict):
+            sign = signs.get(parameter, 0)
+        if (sign > 0):
+            low = max(low, 0.)
+        elif (sign < 0):
+            high = min(high, 0.)
+
+        if not (low < high):
+            raise ValueError("Empty bounds for "+str(parameter)+".")
+        x.append(value)
+        lower.append(low)
+        upper.append(high)
+
+    lower = np.array(lower)
+    upper = np.array(upper)
+
+    problem = FitProblem(system, parameters, t, rows, columns, Y, sigma,
+                         rtol, atol)
+    tasks = [(x0, lower, upper, loss, max_nfev) for x0 in
+             start_points(x, lower, upper, starts, spread, seed)]
+
+    if (processes == 1) or (starts == 1):
+        _init_worker(problem)
+        results = [_fit_start(task) for task in tasks]
+    else:
+        processes = processes or multiprocessing.cpu_count()
+        with multiprocessing.Pool(min(processes, starts),
+                                  initializer=_init_worker,
+                                  initargs=(problem,)) as pool:
+            results = pool.map(_fit_start, tasks)
+
+    best = min(results, key=lambda s: (not np.isfinite(s['cost']), s['cost']))
+
+    return FitResult(problem, best, results, names)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:20:16 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Cache of the solutions, addressed by their content.
+
+The key of a solve is the SHA-256 hash of the assembled arrays of the
+system (names, n0, k, K, c and the non-zero entries of A), of the time
+grid and of the options of the solver. Solving again the same setup with
+the same options returns the stored Solution, without any integration.
+
+The cache has two tiers: an in-memory LRU of the most recent solutions,
+and an optional directory on disk, where each solution is stored in the
+binary format of binaryStorage. The disk tier is shared by all the
+processes using the same directory, and the least recently used entries
+are removed when its size exceeds a limit.
+
+The cache is opt-in: pass a ResultCache to Ecosystem.solve, or enable a
+default one for all the solves with enable().
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import collections
+import numpy as np
+
+import glvEngine
+import binaryStorage
+from LVsolution import Solution
+
+
+# Version of the keys: changing the solver or the storage format must
+# change it, so that old entries are not used.
+KEY_VERSION = 1
+
+# Cache used by Ecosystem.solve when no cache is given, None if disabled.
+default_cache = None
+
+
+def enable(max_entries=128, directory=None, max_bytes=2**30):
+    """
+    Enables a default ResultCache, used by every Ecosystem.solve, and
+    returns it.
+    """
+
+    global default_cache
+    default_cache = ResultCache(max_entries, directory, max_bytes)
+
+    return default_cache
+
+
+def disable():
+    """
+    Disables the default ResultCache.
+    """
+
+    global default_cache
+    default_cache = None
+
+
+def _update(h, array):
+
+    array = np.ascontiguousarray(array)
+    h.update(str(array.dtype).encode() + str(array.shape).encode())
+    h.update(array.tobytes())
+
+
+def system_key(names, n0, k, K, c, A, t, options):
+    """
+    Returns the hexadecimal SHA-256 key of a solve.
+
+    Parameters
+    ----------
+    names, n0, k, K, c, A:
+        The arrays of the system, as returned by Ecosystem.system_arrays.
+        A can be dense or sparse: the same matrix gives the same key.
+    t: array
+        Time grid.
+    options: dict
+        Options of the solver. Values must be JSON serializable.
+
+    """
+
+    h = hashlib.sha256()
+    h.update(json.dumps([KEY_VERSION, list(names), options],
+                        sort_keys=True).encode())
+
+    for x in (n0, k, K, c, t):
+        _update(h, np.asarray(x, dtype=float))
+
+    if glvEngine.issparse(A):
+        A = A.tocsr(copy=True)
+        A.sum_duplicates()
+        A.eliminate_zeros()
+        A.sort_indices()
+        rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+        cols, values = A.indices, A.data
+    else:
+        A = np.asarray(A, dtype=float)
+        rows, cols = np.nonzero(A)
+        values = A[rows, cols]
+
+    _update(h, rows.astype(np.int64))
+    _update(h, cols.astype(np.int64))
+    _update(h, values.astype(float))
+
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    ResultCache(max_entries=128, directory=None, max_bytes=2**30)
+
+    max_entries: int
+        Number of solutions kept in memory.
+    directory: string
+        Directory of the disk tier, created if needed. If None only the
+        memory tier is used.
+    max_bytes: int
+        Maximum size of the disk tier.
+
+    Attributes
+    ----------
+    hits, misses: int
+        Counters of the lookups.
+
+    Methods
+    -------
+    get(key)
+    put(key, solution)
+    clear()
+
+    """
+
+    def __init__(self, max_entries=128, directory=None, max_bytes=2**30):
+
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.memory)
+
+    def __contains__(self, key):
+        return (key in self.memory) or ((self.directory is not None) and
+                                        os.path.isdir(self._path(key)))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    @staticmethod
+    def _copy(solution):
+        # A new Solution sharing the read-only arrays of the stored one.
+        copy = Solution(solution.t, solution.y, solution.species,
+                        {kind: (dict(value) if isinstance(value, dict)
+                                else value)
+                         for kind, value in solution.events.items()})
+        copy.stats = solution.stats
+
+        return copy
+
+    def _remember(self, key, solution):
+
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        while (len(self.memory) > self.max_entries):
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns the Solution stored with key, or None.
+        """
+
+        solution = self.memory.get(key)
+
+        if solution is not None:
+            self.memory.move_to_end(key)
+
+        elif self.directory is not None:
+            path = self._path(key)
+            try:
+                solution = binaryStorage.open_solution(path, mmap=False)
+                with open(os.path.join(path, 'events.json')) as f:
+                    solution.events = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                solution = None
+            if solution is not None:
+                solution.t.flags.writeable = False
+                solution.y.flags.writeable = False
+                self._remember(key, solution)
+
+        if solution is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return self._copy(solution)
+
+    def put(self, key, solution):
+        """
+        Stores a copy of solution with key, in memory and on disk.
+        """
+
+        stored = Solution(np.array(solution.t), np.array(solution.y),
+                          solution.species, solution.events)
+        stored.stats = solution.stats
+        stored.t.flags.writeable = False
+        stored.y.flags.writeable = False
+        self._remember(key, stored)
+
+        if (self.directory is None) or os.path.isdir(self._path(key)):
+            return
+
+        # Written into a temporary directory, then renamed, so that other
+        # processes never find an incomplete entry.
+        temp = self._path(key)+'.'+str(os.getpid())+'.tmp'
+        binaryStorage.save_solution(temp, stored)
+        with open(os.path.join(temp, 'events.json'), 'w') as f:
+            json.dump(stored.events, f)
+        try:
+            os.rename(temp, self._path(key))
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries on disk until their size
+        is within max_bytes.
+        """
+
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and not entry.name.endswith('.tmp'):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total += size
+
+        for mtime, size, path in sorted(entries):
+            if (total <= self.max_bytes):
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """
+        Removes all the entries, in memory and on disk.
+        """
+
+        self.memory.clear()
+
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:25:51 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Forward sensitivities of the solution with respect to the parameters of
+the system, S[t,i,p] = d n_i(t) / d theta_p, computed in a single
+integration instead of two solves for each parameter.
+
+The sensitivities solve the variational equations
+
+    dS/dt = J.S + F,    S(0) = d n0 / d theta
+
+J being the Jacobian of the system and F[i,p] = d f_i / d theta_p. They
+are integrated together with the populations, as a single system whose
+state is n followed by a block of N values for each parameter. The right
+hand side is computed in matrix form, J.S never being built, and all the
+blocks share the Jacobian J, given to the solver in banded form.
+
+Writing the equations as
+
+    f_i = n_i k_i + theta(k_i) k_i n_i**2 / K_i + n_i (E.n)_i / c_i
+
+E being the effective interaction matrix without its diagonal, the
+derivatives are:
+    'GrowthRate' k_i:   n_i + theta(k_i) n_i**2 / K_i
+    'CarrCap' K_i:      - theta(k_i) k_i n_i**2 / K_i**2
+    'ChangeRate' c_i:   - n_i (E.n)_i / c_i**2
+    'intMatrix' (i,j), only if i is before j in the species list, since
+    the lower triangle of the interaction matrix is not used:
+                        n_i n_j / c_i in f_i, - n_i n_j / c_j in f_j
+    'InitialCond' n0_i: only S(0) = 1 for the species i.
+"""
+
+import numpy as np
+
+import glvEngine
+
+
+KINDS = ('InitialCond', 'GrowthRate', 'CarrCap', 'ChangeRate', 'intMatrix')
+
+
+class ParameterIndex:
+    """
+    ParameterIndex(parameters)
+
+    Positions of the parameters, grouped by kind, so that the derivatives
+    of all the parameters of a kind are computed at once.
+
+    parameters: list
+        Tuples (kind, i) or ('intMatrix', (i, j)), kind being one of KINDS
+        and i, j positions of species.
+
+    Attributes
+    ----------
+    columns, species: dicts
+        {kind: array} of the columns of the parameters of each kind and
+        of the species they refer to. For 'intMatrix', species is the
+        array (M,2) of the pairs (i,j).
+
+    """
+
+    def __init__(self, parameters):
+
+        self.P = len(parameters)
+        self.columns = {kind: [] for kind in KINDS}
+        self.species = {kind: [] for kind in KINDS}
+
+        for p, (kind, key) in enumerate(parameters):
+            if not (kind in KINDS):
+                raise ValueError("Unknown parameter: "+str(kind)+".")
+            if (kind == 'intMatrix') and (key[0] == key[1]):
+                raise ValueError("The diagonal interactions are computed from the carrying capacities.")
+            self.species[kind].append(key)
+            self.columns[kind].append(p)
+
+        self.columns = {kind: np.array(value, dtype=int)
+                        for kind, value in self.columns.items()}
+        self.species = {kind: np.array(value, dtype=int)
+                        for kind, value in self.species.items()}
+        self.species['intMatrix'] = self.species['intMatrix'].reshape(-1, 2)
+
+    def initial(self, N):
+        """
+        Returns the initial sensitivities, as the array (P,N) of S(0)
+        transposed.
+        """
+
+        S0 = np.zeros((self.P, N))
+        S0[self.columns['InitialCond'], self.species['InitialCond']] = 1.
+
+        return S0
+
+    def forcing(self, n, k, K, c, A_eff):
+        """
+        Returns the derivatives of the right hand side with respect to the
+        parameters at the state n, as the array (P,N) of F transposed.
+        """
+
+        F = np.zeros((self.P, len(n)))
+        theta = (k > 0)*1.
+
+        p, i = self.columns['GrowthRate'], self.species['GrowthRate']
+        F[p, i] = n[i] + theta[i]*n[i]**2/K[i]
+
+        p, i = self.columns['CarrCap'], self.species['CarrCap']
+        F[p, i] = - theta[i]*k[i]*n[i]**2/K[i]**2
+
+        p, i = self.columns['ChangeRate'], self.species['ChangeRate']
+        if (len(p) > 0):
+            off_diagonal = A_eff.dot(n) - A_eff.diagonal()*n
+            F[p, i] = - n[i]*off_diagonal[i]/c[i]**2
+
+        p = self.columns['intMatrix']
+        i, j = self.species['intMatrix'].T
+        upper = (i < j)
+        p, i, j = p[upper], i[upper], j[upper]
+        F[p, i] = n[i]*n[j]/c[i]
+        F[p, j] = - n[i]*n[j]/c[j]
+
+        return F
+
+
+def augmented_rhs(z, t, k, K, c, A_eff, index):
+    """
+    Right hand side of the populations and of the sensitivities, stored in
+    z as n followed by S transposed.
+    """
+
+    N = len(k)
+    n = z[:N]
+    St = z[N:].reshape(index.P, N)
+
+    growth = k + A_eff.dot(n)/c
+    dSt = (St*growth + A_eff.dot(St.T).T*(n/c)
+           + index.forcing(n, k, K, c, A_eff))
+
+    return np.concatenate([n*growth, dSt.ravel()])
+
+
+class AugmentedJacobian:
+    """
+    AugmentedJacobian(A_eff, blocks)
+
+    Jacobian of the augmented system in the packed banded form of odeint,
+    with the Jacobian J of the system repeated on each of the blocks
+    (the dependence of the sensitivities on n is neglected, which only
+    affects the convergence of the corrector of the solver, not the
+    solution). J is packed once for each call and tiled over the blocks.
+
+    """
+
+    def __init__(self, A_eff, blocks):
+
+        self.ml, self.mu = glvEngine.bandwidth(A_eff)
+        self.blocks = blocks
+
+    def __call__(self, z, t, k, K, c, A_eff, index):
+
+        N = len(k)
+        J = glvEngine.dense_jacobian(z[:N], t, k, c, A_eff)
+
+        band = np.zeros((self.ml + self.mu + 1, N))
+        for r in range(self.ml + self.mu + 1):
+            offset = self.mu - r
+            if (offset >= 0):
+                band[r, offset:] = np.diagonal(J, offset)
+            else:
+                band[r, :N + offset] = np.diagonal(J, offset)
+
+        return np.tile(band, (1, self.blocks))
+
+
+def forward_sensitivity(n0, t, k, K, c, A, parameters, rtol=None, atol=None,
+                        full_output=False):
+    """
+    Integrates the system and its sensitivities over the time grid t.
+
+    Parameters
+    ----------
+    n0, t, k, K, c, A:
+        The arrays of the system, as returned by Ecosystem.system_arrays.
+    parameters: list
+        Tuples (kind, i) or ('intMatrix', (i, j)), kind being one of
+        KINDS and i, j positions of species.
+    rtol, atol: float
+        Tolerances of the solver, applied to the populations and to the
+        sensitivities.
+    full_output: bool
+        If True the dictionary with the counters of odeint is also
+        returned.
+
+    Returns
+    -------
+    The tuple (y, S): the populations, array (T,N), and the sensitivities,
+    array (T,N,P). With full_output, also the counters.
+
+    """
+
+    from scipy.integrate import odeint
+
+    n0 = np.asarray(n0, dtype=float)
+    k = np.asarray(k, dtype=float)
+    K = np.asarray(K, dtype=float)
+    c = np.asarray(c, dtype=float)
+    A_eff = glvEngine.effective_matrix(A)
+    N = len(n0)
+
+    index = ParameterIndex(parameters)
+    jacobian = AugmentedJacobian(A_eff, index.P + 1)
+
+    z0 = np.concatenate([n0, index.initial(N).ravel()])
+    z, info = odeint(augmented_rhs, z0, t, args=(k, K, c, A_eff, index),
+                     Dfun=jacobian, ml=jacobian.ml, mu=jacobian.mu,
+                     rtol=rtol, atol=atol, full_output=True)
+
+    y = z[:, :N]
+    S = z[:, N:].reshape(len(t), index.P, N).swapaxes(1, 2)
+
+    if full_output:
+        return y, S, info
+
+    return y, S
+
+
+class Sensitivity:
+    """
+    Sensitivity(solution, parameters, S)
+
+    Sensitivities of a solution, as returned by Ecosystem.sensitivity.
+
+    Attributes
+    ----------
+    solution: Solution
+    parameters: list
+        The parameters, as tuples (kind, name) or ('intMatrix', (name1,
+        name2)), in the form of the points of parallelScan.
+    S: array (T,N,P)
+        S[t,i,p] is the derivative of the population of the i-th species
+        at the t-th time with respect to the p-th parameter.
+
+    Methods
+    -------
+    __getitem__(parameter)
+    relative()
+
+    """
+
+    def __init__(self, solution, parameters, S):
+
+        self.solution = solution
+        self.parameters = list(parameters)
+        self.S = S
+
+    def __getitem__(self, parameter):
+        """
+        Returns the sensitivities (T,N) to a parameter.
+        """
+
+        try:
+            p = self.parameters.index(parameter)
+        except ValueError:
+            raise KeyError("Parameter not found: "+str(parameter)+".")
+
+        return self.S[:, :, p]
+
+    def relative(self, values):
+        """
+        Returns the relative sensitivities d log(n) / d log(theta), given
+        the values (P,) of the parameters. They are NaN where a population
+        is zero.
+        """
+
+        y = self.solution.y[:, :, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(y == 0, np.nan, self.S*np.asarray(values)/y)
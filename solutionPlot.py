@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:17:39 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Plotting of solutions with many species and long time grids.
+
+Each population is decimated to a few thousand points before drawing,
+with a method that preserves the shape of the curve: 'minmax' keeps the
+minimum and the maximum of each time bin, so that no peak is lost, while
+'lttb' (Largest Triangle Three Buckets) keeps the point of each bin that
+forms the largest triangle with its neighbours. All the species are then
+drawn as a single LineCollection, instead of one line per species.
+Large systems can be reduced to the top-k species, the others being
+summed into a single aggregate curve.
+
+Figures can be rendered without any display: if a path is given, the
+figure is drawn with the Agg backend and saved, without pyplot.
+matplotlib is imported only when a plot is made.
+"""
+
+import numpy as np
+
+
+# Default number of points of each decimated curve
+MAX_POINTS = 2000
+
+# Maximum number of curves with an entry in the legend
+LEGEND_MAX = 10
+
+
+def minmax_decimate(t, y, n_bins):
+    """
+    Keeps the minimum and the maximum of each species in each of n_bins
+    time bins, in time order, plus the first and the last point.
+
+    Parameters
+    ----------
+    t: array (T,)
+    y: array (T,N)
+    n_bins: int
+
+    Returns
+    -------
+    The tuple (tx, yx) of arrays (M,N), M <= 2*n_bins + 2. Each column is
+    the decimated curve of a species, with its own times.
+
+    """
+
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    T, N = y.shape
+
+    # Whole bins are a view of y, the last partial bin is processed apart
+    size = -(-T // n_bins)
+    whole = T // size
+    low = []
+    high = []
+    if (whole > 0):
+        bins = y[:whole*size].reshape(whole, size, N)
+        start = (np.arange(whole) * size)[:, None]
+        low.append(start + bins.argmin(axis=1))
+        high.append(start + bins.argmax(axis=1))
+    if (whole*size < T):
+        low.append(whole*size + y[whole*size:].argmin(axis=0)[None])
+        high.append(whole*size + y[whole*size:].argmax(axis=0)[None])
+    low = np.concatenate(low)
+    high = np.concatenate(high)
+
+    index = np.concatenate([np.zeros((1, N), dtype=int),
+                            np.stack([np.minimum(low, high),
+                                      np.maximum(low, high)], axis=1)
+                              .reshape(2*len(low), N),
+                            np.full((1, N), T - 1)])
+
+    return t[index], np.take_along_axis(y, index, axis=0)
+
+
+def lttb_decimate(t, y, n_points):
+    """
+    Largest Triangle Three Buckets decimation of each species to n_points
+    points, the first and the last included. The species are processed
+    together, bucket by bucket.
+
+    Returns
+    -------
+    The tuple (tx, yx) of arrays (n_points,N).
+
+    """
+
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    T, N = y.shape
+
+    edges = np.linspace(1, T - 1, n_points - 1).astype(int)
+    index = np.zeros((n_points, N), dtype=int)
+    index[-1] = T - 1
+    columns = np.arange(N)
+
+    for b in range(n_points - 2):
+        first, last = edges[b], max(edges[b+1], edges[b] + 1)
+
+        # Average of the next bucket (the last point for the last bucket)
+        if (b == n_points - 3):
+            t_next, y_next = t[-1], y[-1]
+        else:
+            end = max(edges[b+2], last + 1)
+            t_next, y_next = t[last:end].mean(), y[last:end].mean(axis=0)
+
+        t_prev = t[index[b]]
+        y_prev = y[index[b], columns]
+        ts = t[first:last, None]
+        ys = y[first:last]
+        area = np.abs((t_prev - t_next)*(ys - y_prev)
+                      - (t_prev - ts)*(y_next - y_prev))
+        index[b+1] = first + area.argmax(axis=0)
+
+    return t[index], np.take_along_axis(y, index, axis=0)
+
+
+def decimate(t, y, max_points=MAX_POINTS, method='minmax'):
+    """
+    Decimates each species to at most about max_points points with the
+    given method, 'minmax' or 'lttb'. Short series are left unchanged.
+
+    Returns
+    -------
+    The tuple (tx, yx) of arrays (M,N).
+
+    """
+
+    y = np.asarray(y, dtype=float)
+    T, N = y.shape
+
+    if (T <= max_points):
+        return np.broadcast_to(np.asarray(t, dtype=float)[:, None], (T, N)), y
+
+    if (method == 'minmax'):
+        return minmax_decimate(t, y, max(1, (max_points - 2) // 2))
+    if (method == 'lttb'):
+        return lttb_decimate(t, y, max(3, max_points))
+
+    raise ValueError("Unknown decimation method: "+str(method)+".")
+
+
+def top_species(y, k, by='max'):
+    """
+    Returns the columns of the k species with the largest population,
+    measured by 'max', 'mean' or 'final', in decreasing order.
+    """
+
+    y = np.asarray(y, dtype=float)
+
+    if (by == 'max'):
+        score = y.max(axis=0)
+    elif (by == 'mean'):
+        score = y.mean(axis=0)
+    elif (by == 'final'):
+        score = y[-1]
+    else:
+        raise ValueError("Unknown ranking: "+str(by)+".")
+
+    return np.argsort(-score, kind='stable')[:k]
+
+
+def plot_solution(solution, ax=None, path=None, max_points=MAX_POINTS,
+                  method='minmax', top=None, by='max', others=True,
+                  linewidth=None, dpi=100):
+    """
+    Plots the population of each species against time, as a single
+    LineCollection of decimated curves.
+
+    Parameters
+    ----------
+    solution: Solution
+    ax: matplotlib Axes
+        Axes where to draw. If not given, a new figure is created.
+    path: string
+        If given, the figure is rendered with the Agg backend and saved
+        into this file. No display is needed.
+    max_points: int
+        Maximum number of points of each curve, see decimate.
+    method: string
+        Decimation method, 'minmax' or 'lttb'.
+    top: int
+        If given, only the top species are drawn, ranked by 'by'.
+    by: string
+        Ranking of the species: 'max', 'mean' or 'final' population.
+    others: bool
+        If True and top is given, the populations of the other species are
+        summed into a single curve 'others', drawn dashed.
+    linewidth: float
+        Width of the lines. By default 4 for a few species, 1 otherwise.
+    dpi: int
+        Resolution of the saved figure.
+
+    Returns
+    -------
+    The tuple (fig, ax).
+
+    """
+
+    from matplotlib.collections import LineCollection
+
+    y = np.asarray(solution.y)
+    names = list(solution.species)
+    styles = None
+
+    if (top is not None) and (top < len(names)):
+        columns = top_species(y, top, by)
+        rest = np.setdiff1d(np.arange(len(names)), columns)
+        names = [names[i] for i in columns]
+        y = y[:, columns]
+        if others:
+            y = np.column_stack([y, np.asarray(solution.y)[:, rest].sum(axis=1)])
+            names.append('others')
+            styles = ['solid']*(len(names) - 1) + ['dashed']
+
+    tx, yx = decimate(solution.t, y, max_points, method)
+
+    if ax is None:
+        if path is None:
+            import matplotlib.pyplot as plt
+            fig, ax = plt.subplots()
+        else:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            fig = Figure()
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot()
+    else:
+        fig = ax.figure
+
+    N = len(names)
+    if linewidth is None:
+        linewidth = 4 if (N <= LEGEND_MAX) else 1
+
+    # Colors of the default cycle if the species can be told apart,
+    # otherwise a colormap
+    colors = ['C'+str(i) for i in range(N)] if (N <= LEGEND_MAX) else None
+    lines = LineCollection(np.stack([tx.T, yx.T], axis=-1),
+                           linewidths=linewidth, colors=colors,
+                           linestyles=styles or 'solid')
+    if colors is None:
+        lines.set_array(np.arange(N))
+        lines.set_cmap('viridis')
+    ax.add_collection(lines)
+    ax.autoscale_view()
+
+    ax.set_facecolor('white')
+    ax.set_xlabel('time')
+    ax.set_ylabel('population')
+
+    if (N <= LEGEND_MAX):
+        from matplotlib.lines import Line2D
+        handles = [Line2D([], [], color=colors[i], linewidth=linewidth,
+                          linestyle=styles[i] if styles else 'solid')
+                   for i in range(N)]
+        ax.legend(handles, names, loc='best')
+
+    if path is not None:
+        fig.savefig(path, dpi=dpi)
+
+    return fig, ax
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:15:03 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Statistics of a solve: wall-clock time of each stage and counters of the
+solver. They are attached to the Solution as the attribute 'stats'.
+
+The counters of odeint come from its full output: they are reported by
+LSODA at each time of the grid, so that the steps and the switches between
+the non-stiff (Adams) and stiff (BDF) methods are resolved at the grid
+times. LSODA does not report the rejected steps.
+
+Each solve also writes its statistics as a JSON record on the logger
+'glv.solve', at level INFO. Nothing is written unless logging is
+configured, e.g. with logging.basicConfig(level=logging.INFO).
+"""
+
+import json
+import time
+import logging
+import contextlib
+import numpy as np
+
+
+logger = logging.getLogger('glv.solve')
+
+# Methods reported by LSODA in 'mused'
+METHODS = {1: 'adams', 2: 'bdf'}
+
+
+class SolveStats:
+    """
+    SolveStats(backend)
+
+    Attributes
+    ----------
+    backend: string
+    stages: dict
+        {stage: seconds}, in the order in which the stages have been run.
+    nfev, njev: int
+        Number of evaluations of the right hand side and of the Jacobian.
+    steps: int
+        Number of accepted steps.
+    step_size: dict
+        {'min', 'mean', 'max', 'last'}: statistics of the step sizes.
+    methods: dict
+        {method: number of grid intervals in which it was used}.
+    switches: list
+        Tuples (time, method) with the first grid time where the solver
+        was found using a different method.
+    extra: dict
+        Counters specific to the kind of integration, e.g. the 'restarts'
+        of the integration with pruning.
+
+    Methods
+    -------
+    stage(name)
+    add_odeint(info, t)
+    add_steps(nfev, njev, step_sizes)
+    to_dict()
+    log(level=logging.INFO)
+
+    """
+
+    def __init__(self, backend):
+
+        self.backend = backend
+        self.stages = {}
+        self.nfev = 0
+        self.njev = 0
+        self.steps = 0
+        self.step_size = {}
+        self.methods = {}
+        self.switches = []
+        self.extra = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager timing the code inside it as the stage 'name'. The
+        times of stages with the same name are summed.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.) \
+                                + time.perf_counter() - start
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def _step_sizes(self, sizes):
+
+        sizes = np.asarray(sizes, dtype=float)
+        sizes = sizes[sizes > 0]
+        if (len(sizes) == 0):
+            return
+
+        self.step_size = {'min': sizes.min().item(),
+                          'mean': sizes.mean().item(),
+                          'max': sizes.max().item(),
+                          'last': sizes[-1].item()}
+
+    def add_odeint(self, info, t):
+        """
+        Reads the full output 'info' of odeint over the grid t. With a
+        single time the solver takes no step and the counters are empty.
+        """
+
+        if (len(info['nst']) == 0):
+            return
+
+        self.nfev += int(info['nfe'][-1])
+        self.njev += int(info['nje'][-1])
+        self.steps += int(info['nst'][-1])
+
+        # Grid intervals with at least one step
+        stepped = np.diff(np.concatenate([[0], info['nst']])) > 0
+        self._step_sizes(info['hu'][stepped])
+
+        mused = info['mused'][stepped]
+        times = np.asarray(t, dtype=float)[1:][stepped]
+        for code in np.unique(mused):
+            self.methods[METHODS.get(int(code), str(code))] = \
+                int(np.count_nonzero(mused == code))
+        for i in np.flatnonzero(np.diff(mused)) + 1:
+            self.switches.append((times[i].item(),
+                                  METHODS.get(int(mused[i]), str(mused[i]))))
+
+    def add_steps(self, nfev, njev, step_sizes):
+        """
+        Adds the counters of a solver stepped directly.
+        """
+
+        self.nfev += int(nfev)
+        self.njev += int(njev)
+        self.steps += len(step_sizes)
+        self._step_sizes(step_sizes)
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary of JSON types.
+        """
+
+        return {'backend': self.backend, 'stages': dict(self.stages),
+                'total': self.total, 'nfev': self.nfev, 'njev': self.njev,
+                'steps': self.steps, 'step_size': dict(self.step_size),
+                'methods': dict(self.methods),
+                'switches': [list(s) for s in self.switches],
+                'extra': dict(self.extra)}
+
+    def log(self, level=logging.INFO):
+        """
+        Writes the statistics as a JSON record on the logger 'glv.solve'.
+        """
+
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(self.to_dict()),
+                       extra={'glv_stats': self.to_dict()})
+
+    def __repr__(self):
+
+        stages = ', '.join(name+'='+format(seconds, '.3g')+'s'
+                           for name, seconds in self.stages.items())
+
+        return ('SolveStats('+self.backend+': '+stages+'; nfev='
+                +str(self.nfev)+', njev='+str(self.njev)+', steps='
+                +str(self.steps)+')')
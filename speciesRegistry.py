@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:01:10 2026
+
+@author: FMagnani
+GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
+
+Storage of the species of an Ecosystem.
+Each species gets a slot: its name is mapped to the slot by a dictionary
+and its parameters are stored at that position of preallocated NumPy
+arrays, so that every lookup is O(1). Interactions are stored as
+adjacency dictionaries between slots, so that removing a species costs
+O(number of its interactions).
+Removed species leave an empty slot, the order of the others being
+preserved. Slots are compacted once the empty ones outnumber the others.
+
+The arrays assembled for the integration are cached in an AssembledSystem.
+Changing a parameter or an existing interaction patches the cached arrays
+in place, while adding or removing species discards them.
+"""
+
+import numpy as np
+import glvEngine
+
+
+# Rows of SpeciesRegistry.params
+PARAMETERS = ('InitialCond', 'GrowthRate', 'CarrCap', 'ChangeRate')
+
+
+class AssembledSystem:
+    """
+    AssembledSystem(slots, names, params, A)
+
+    Arrays of the system, in the order of the species list, as returned by
+    Ecosystem.system_arrays.
+
+    Attributes
+    ----------
+    names: list
+    n0, k, K, c: arrays (N,)
+    A: CSR matrix (N,N)
+        Interaction matrix, with the diagonal always stored explicitly.
+    position: dict
+        {slot: position in the species list}
+    diagonal: array (N,)
+        Position of the diagonal entries in A.data.
+
+    """
+
+    __slots__ = ('names', 'position', 'params', 'n0', 'k', 'K', 'c', 'A',
+                 '_dense', 'diagonal')
+
+    def __init__(self, slots, names, params, A):
+
+        self.names = names
+        self.position = {int(s): i for i, s in enumerate(slots)}
+        self.params = params
+        self.n0, self.k, self.K, self.c = params
+        self.A = A
+        self.A.sort_indices()
+        self._dense = None
+
+        N = len(names)
+        self.diagonal = np.array([self._find(i, i) for i in range(N)], 
+                                 dtype=int)
+
+    def _find(self, i, j):
+        """
+        Position of the entry (i,j) in A.data, or -1 if it is not stored.
+        """
+
+        start, end = self.A.indptr[i], self.A.indptr[i+1]
+        p = start + np.searchsorted(self.A.indices[start:end], j)
+
+        if (p < end) and (self.A.indices[p] == j):
+            return p
+
+        return -1
+
+    def dense(self):
+        """
+        Returns the interaction matrix as a dense array, computed once.
+        """
+
+        if self._dense is None:
+            self._dense = self.A.toarray()
+
+        return self._dense
+
+    def patch_param(self, row, slot, value):
+        """
+        Updates a parameter and, if needed, the diagonal of A.
+        """
+
+        i = self.position[slot]
+        self.params[row, i] = value
+
+        if (row > 0):
+            aii = glvEngine.diagonal_terms(self.k[i], self.K[i], self.c[i])
+            self.A.data[self.diagonal[i]] = aii
+            if self._dense is not None:
+                self._dense[i, i] = aii
+
+    def patch_interaction(self, slot1, slot2, value):
+        """
+        Updates an off-diagonal entry of A already stored. Returns False if 
+        the entry is not stored, so that A must be rebuilt.
+        """
+
+        i = self.position[slot1]
+        j = self.position[slot2]
+        p = self._find(i, j)
+
+        if (p < 0) or (i == j):
+            return False
+
+        self.A.data[p] = value
+        if self._dense is not None:
+            self._dense[i, j] = value
+
+        return True
+
+
+class SpeciesRegistry:
+    """
+    SpeciesRegistry(capacity=16)
+
+    Attributes
+    ----------
+    index: dict
+        {name: slot}
+    names: list
+        Name of the species in each slot, None for empty slots.
+    params: array (4, capacity)
+        Parameters of each slot, in the order of PARAMETERS. NaN means
+        that the parameter has not been set.
+    alive: array (capacity,)
+        True for the slots in use.
+    links: dict
+        {slot1: {slot2: value}}, the interaction of slot1 with respect to
+        slot2.
+    linked_by: dict
+        {slot2: set of slot1}, the reverse of links.
+    pending: dict
+        {name2: {slot1: value}}, interactions with respect to species not
+        added yet. They become links when name2 is added.
+    assembled: AssembledSystem
+        Cached arrays of the system, None when they must be rebuilt.
+
+    """
+
+    __slots__ = ('index', 'names', 'params', 'alive', 'links', 'linked_by',
+                 'pending', 'pending_from', 'assembled')
+
+    def __init__(self, capacity=16):
+
+        self.index = {}
+        self.names = []
+        self.params = np.full((len(PARAMETERS), capacity), np.nan)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.links = {}
+        self.linked_by = {}
+        self.pending = {}
+        self.pending_from = {}
+        self.assembled = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def slots(self):
+        """
+        Returns the array of the slots in use, in the order in which the
+        species have been added.
+        """
+
+        return np.flatnonzero(self.alive[:len(self.names)])
+
+    def species(self):
+        """
+        Returns the list of the species' names, in order.
+        """
+
+        return [self.names[s] for s in self.slots()]
+
+    def slot(self, name):
+        """
+        Returns the slot of the species 'name'.
+        Raises TypeError if the species is not present.
+        """
+
+        try:
+            return self.index[name]
+        except KeyError:
+            raise TypeError("""Species not found.""")
+
+    def _reserve(self, n_new):
+
+        needed = len(self.names) + n_new
+        capacity = self.alive.shape[0]
+
+        if (needed <= capacity):
+            return
+
+        while (capacity < needed):
+            capacity *= 2
+
+        params = np.full((len(PARAMETERS), capacity), np.nan)
+        params[:, :len(self.names)] = self.params[:, :len(self.names)]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.names)] = self.alive[:len(self.names)]
+
+        self.params = params
+        self.alive = alive
+
+    def add(self, name):
+        """
+        Adds the species 'name' and returns its slot.
+        """
+
+        if (name in self.index):
+            raise TypeError("""Name already existing. Species must have different names.""")
+
+        self._reserve(1)
+
+        self.assembled = None
+
+        slot = len(self.names)
+        self.names.append(name)
+        self.index[name] = slot
+        self.alive[slot] = True
+        self.links[slot] = {}
+        self.linked_by[slot] = set()
+
+        for slot1, value in self.pending.pop(name, {}).items():
+            self.pending_from[slot1].discard(name)
+            self.links[slot1][slot] = value
+            self.linked_by[slot].add(slot1)
+
+        return slot
+
+    def add_many(self, names):
+        """
+        Adds all the species in the list 'names' and returns the array of
+        their slots.
+        """
+
+        names = list(names)
+        if not (len(set(names)) == len(names)):
+            raise TypeError("""Name already existing. Species must have different names.""")
+
+        self._reserve(len(names))
+
+        return np.array([self.add(name) for name in names], dtype=int)
+
+    def remove(self, name):
+        """
+        Removes the species 'name', its parameters and all its
+        interactions.
+        """
+
+        slot = self.slot(name)
+        self.assembled = None
+
+        for slot2 in self.links.pop(slot):
+            self.linked_by[slot2].discard(slot)
+        for slot1 in self.linked_by.pop(slot):
+            del self.links[slot1][slot]
+        for name2 in self.pending_from.pop(slot, ()):
+            del self.pending[name2][slot]
+            if not self.pending[name2]:
+                del self.pending[name2]
+
+        del self.index[name]
+        self.names[slot] = None
+        self.alive[slot] = False
+        self.params[:, slot] = np.nan
+
+        if (len(self.names) > 2*len(self.index) + 16):
+            self.compact()
+
+    def compact(self):
+        """
+        Moves the species into consecutive slots, removing the empty ones.
+        The order of the species is preserved.
+        """
+
+        old = self.slots()
+        new = {int(s): i for i, s in enumerate(old)}
+        self.assembled = None
+
+        self.names = [self.names[s] for s in old]
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        params = np.full(self.params.shape, np.nan)
+        params[:, :len(old)] = self.params[:, old]
+        self.params = params
+        self.alive[:] = False
+        self.alive[:len(old)] = True
+
+        self.links = {new[s1]: {new[s2]: v for s2, v in row.items()}
+                      for s1, row in self.links.items()}
+        self.linked_by = {new[s2]: {new[s1] for s1 in col}
+                          for s2, col in self.linked_by.items()}
+        self.pending = {name2: {new[s1]: v for s1, v in row.items()}
+                        for name2, row in self.pending.items()}
+        self.pending_from = {new[s1]: names2
+                             for s1, names2 in self.pending_from.items()}
+
+    def set_param(self, parameter, name, value):
+        """
+        Sets one of the PARAMETERS of the species 'name'.
+        """
+
+        row = PARAMETERS.index(parameter)
+        slot = self.slot(name)
+        self.params[row, slot] = value
+
+        if self.assembled is not None:
+            self.assembled.patch_param(row, slot, value)
+
+    def get_param(self, parameter, name):
+
+        value = self.params[PARAMETERS.index(parameter), self.slot(name)]
+        if np.isnan(value):
+            raise KeyError(name)
+
+        return value
+
+    def set_interaction(self, name1, name2, value):
+        """
+        Sets the interaction of name1 with respect to name2. name2 may be a
+        species that has not been added yet.
+        """
+
+        slot1 = self.slot(name1)
+
+        if (name2 in self.index):
+            slot2 = self.index[name2]
+            self.links[slot1][slot2] = value
+            self.linked_by[slot2].add(slot1)
+            if self.assembled is not None:
+                if not self.assembled.patch_interaction(slot1, slot2, value):
+                    self.assembled = None
+        else:
+            self.pending.setdefault(name2, {})[slot1] = value
+            self.pending_from.setdefault(slot1, set()).add(name2)
+
+    def set_interactions(self, slots, matrix):
+        """
+        Replaces all the interactions among the given slots with the
+        off-diagonal entries of matrix. Zero entries are not stored.
+
+        Parameters
+        ----------
+        slots: array (M,)
+        matrix: array (M,M) or sparse matrix
+
+        """
+
+        slots = np.asarray(slots, dtype=int)
+        inside = set(slots.tolist())
+        self.assembled = None
+
+        for s1 in inside:
+            for s2 in [s2 for s2 in self.links[s1] if s2 in inside]:
+                del self.links[s1][s2]
+                self.linked_by[s2].discard(s1)
+
+        if hasattr(matrix, 'tocoo'):
+            matrix = matrix.tocoo()
+            rows, cols, values = matrix.row, matrix.col, matrix.data
+        else:
+            matrix = np.asarray(matrix, dtype=float)
+            rows, cols = np.nonzero(matrix)
+            values = matrix[rows, cols]
+
+        keep = (rows != cols) & (values != 0)
+        for s1, s2, value in zip(slots[rows[keep]].tolist(),
+                                 slots[cols[keep]].tolist(),
+                                 values[keep].tolist()):
+            self.links[s1][s2] = value
+            self.linked_by[s2].add(s1)
+
+    def interactions(self):
+        """
+        Returns the dictionary {(name1, name2): value} of all the
+        interactions set, including the pending ones.
+        """
+
+        result = {}
+        for s1, row in self.links.items():
+            for s2, value in row.items():
+                result[(self.names[s1], self.names[s2])] = value
+        for name2, row in self.pending.items():
+            for s1, value in row.items():
+                result[(self.names[s1], name2)] = value
+
+        return result
+
+    def parameter_dict(self, parameter):
+        """
+        Returns the dictionary {name: value} of one of the PARAMETERS, for
+        the species where it has been set.
+        """
+
+        row = self.params[PARAMETERS.index(parameter)]
+
+        return {self.names[s]: row[s].item() for s in self.slots()
+                if not np.isnan(row[s])}
+
+    def coo_entries(self, slots):
+        """
+        Returns the off-diagonal interactions among the given slots as the
+        arrays (rows, cols, values), rows and cols being positions in
+        slots.
+        """
+
+        position = {int(s): i for i, s in enumerate(slots)}
+
+        rows = []
+        cols = []
+        values = []
+        for s1 in position:
+            for s2, value in self.links[s1].items():
+                if not (s1 == s2):
+                    rows.append(position[s1])
+                    cols.append(position[s2])
+                    values.append(value)
+
+        return (np.array(rows, dtype=int), np.array(cols, dtype=int),
+                np.array(values, dtype=float))
@@ -9,7 +9,6 @@ GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
 """
 
 import systemDynamicGenerator
-import pandas as pd 
 
 def pad_list(list_to_pad, new_length, padding_value):
     """
@@ -52,19 +51,18 @@ def create_dfSetUp(data):
     data: Species
         An instance of the class Species.
     """
-    N = len(data.species_list)
+    import pandas as pd
     
-    df = pd.DataFrame()
-
-    col_names = ['Species','Initial cond','Growth rate','Carrying cap','Change rate']
-    for i in range(5):
-        df[col_names[i]] = data.create_data()[i+1]
+    N, names, n0, k, K, c, A = data.create_data()
+    
+    df = pd.DataFrame({'Species': names, 'Initial cond': n0, 
+                       'Growth rate': k, 'Carrying cap': K, 
+                       'Change rate': c})
 
-    for i in range(N):
-        col = 'A_row'+str(i)
-        df[col] = data.create_data()[6][i]
+    # The column 'A_row'+str(i) holds the i-th row of A
+    A_rows = pd.DataFrame(A.T, columns=['A_row'+str(i) for i in range(N)])
     
-    return df
+    return pd.concat([df, A_rows], axis=1)
 
    
 def generate_Integrator(N, t_max, t_step):
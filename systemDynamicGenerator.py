@@ -8,6 +8,20 @@ GitHub repo: https://github.com/FMagnani/Lotka_Volterra_N_species_model
 
 """
 
+import os
+import marshal
+import functools
+import importlib.util
+
+
+# Number of compiled systems kept in memory by compile_System.
+CACHE_SIZE = 32
+
+# Directory of the on-disk cache of compiled systems, None to disable it.
+# It can be set with set_cache_dir or the environment variable 
+# 'GLV_CODEGEN_CACHE'.
+cache_dir = os.environ.get('GLV_CODEGEN_CACHE')
+
 def merge_All(N, max_time, t_steps):
 
     """
@@ -67,10 +81,7 @@ def current_system(data):
     Returns the system of equations with current variables values, as a string.
     """
     
-    k = data.create_data()[3]
-    c = data.create_data()[5]
-    A = data.create_data()[6]
-    N = len(k)
+    N, names, n0, k, K, c, A = data.create_data()
     
     sys =[]
     string_sys = ''
@@ -99,23 +110,130 @@ def create_Module(N):
     the current dimension of the system.
     """
     
-    str0 = create_Strings(N)[0]
-    str2 = create_Strings(N)[2]
-    str4 = create_Strings(N)[4]
-    str3 = create_Strings(N)[3]
-    str1 = create_Strings(N)[1]
-    str5 = create_Strings(N)[5]
+    str0, str1, str2, str3, str4, str5 = create_Strings(N)
     
-    module = '\ndef system (y, t, '+ str0 +'):\n' \
-             +'\n    '+ str2 +' = y\n' \
-             +'\n'+ str4 \
-             +'\n    dydt = ['+ str3 +']\n' \
-             +'\n    return dydt\n' \
+    module = create_System(N, (str0, str2, str3, str4)) \
              +'\nsol = odeint(system,('+ str5 +'), t, args=('+ str1 +'))\n'
     
     return module
 
 
+def create_System(N, strings=None):
+    """
+    Returns the code of the function 'system' alone, i.e. the right hand 
+    side of the system of equations. It depends only on N: parameters,
+    initial values and time grid are passed when it is called.
+    
+    strings: tuple
+        The strings 0, 2, 3, 4 of create_Strings(N), if already computed.
+    """
+    
+    if strings is None:
+        str0, str1, str2, str3, str4, str5 = create_Strings(N)
+    else:
+        str0, str2, str3, str4 = strings
+    
+    return '\ndef system (y, t, '+ str0 +'):\n' \
+           +'\n    '+ str2 +' = y\n' \
+           +'\n'+ str4 \
+           +'\n    dydt = ['+ str3 +']\n' \
+           +'\n    return dydt\n'
+
+
+def set_cache_dir(path):
+    """
+    Sets the directory of the on-disk cache of compiled systems. With None
+    the on-disk cache is disabled. The directory is created if needed.
+    """
+    
+    global cache_dir
+    
+    if path is not None:
+        os.makedirs(path, exist_ok=True)
+    cache_dir = path
+
+
+def _cache_file(N):
+    
+    # The bytecode is valid only for the interpreter that compiled it.
+    tag = importlib.util.MAGIC_NUMBER.hex()
+    
+    return os.path.join(cache_dir, 'system_'+str(N)+'_'+tag+'.marshal')
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_System(N):
+    """
+    Returns the compiled function 'system' for N species, generated by 
+    create_System. Results are kept in memory, so that the code is 
+    generated and compiled only once for each N. If an on-disk cache is
+    set, the compiled code is also stored there and reused by later
+    sessions.
+    
+    The function has the signature system(y, t, *args), args being the
+    tuple returned by system_args.
+    """
+    
+    code = None
+    
+    if cache_dir is not None:
+        path = _cache_file(N)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                try:
+                    code = marshal.load(f)
+                except (EOFError, ValueError, TypeError):
+                    code = None
+    
+    if code is None:
+        code = compile(create_System(N), '<system_'+str(N)+'>', 'exec')
+        if cache_dir is not None:
+            # Written to a temporary file first, so that a concurrent 
+            # reader never finds it incomplete.
+            temp = path+'.'+str(os.getpid())
+            with open(temp, 'wb') as f:
+                marshal.dump(code, f)
+            os.replace(temp, path)
+    
+    namespace = {}
+    exec(code, namespace)
+    
+    return namespace['system']
+
+
+def system_args(k, K, c, A):
+    """
+    Returns the tuple of the parameters of the function 'system', in the
+    order of its signature.
+    """
+    
+    N = len(k)
+    args = list(k) + list(K) + list(c)
+    for i in range(N):
+        args.extend(A[i][i:])
+    
+    return tuple(float(x) for x in args)
+
+
+def integrate_System(n0, t, k, K, c, A, full_output=False):
+    """
+    Integrates the system with the compiled function of compile_System.
+    Nothing is written on disk, unless the on-disk cache is set.
+    
+    Returns
+    -------
+    array (T,N) with the populations at each time of t, and the dictionary
+    with the counters of odeint if full_output is True.
+    """
+    
+    from scipy.integrate import odeint
+    
+    system = compile_System(len(n0))
+    
+    return odeint(system, tuple(n0), t, args=system_args(k, K, c, A),
+                  full_output=full_output)
+
+
 
 
 def create_Strings(N):
@@ -177,20 +295,21 @@ def create_Strings(N):
     sys = []    
     
     for i in range(N):
-        sys.append( '    dn'+str(i)+'dt = k'+str(i)+'*n'+str(i)+' + A'+str(i)*2
+        sys.append( '    dn'+str(i)+'dt = k'+str(i)+'*n'+str(i)+' + A'+str(i)+'_'+str(i)
                    +('*n'+str(i))*2+'/c'+str(i) )
         
     
         
+    # The underscore keeps the names unique when N > 11 (A1_11 and A11_1).
     for i in range(N):
         for j in range(N)[i:]:
-            string_vars += 'A' + str(i) + str(j) + ','
+            string_vars += 'A' + str(i) + '_' + str(j) + ','
         
             string_args += 'A[' + str(i) + '][' + str(j) + '],'
             
             if not (i==j):
-                sys[i] +=' + A'+str(i)+str(j)+'*n'+str(i)+'*n'+str(j)+'/c'+str(i)
-                sys[j] +=' - A'+str(i)+str(j)+'*n'+str(j)+'*n'+str(i)+'/c'+str(j)
+                sys[i] +=' + A'+str(i)+'_'+str(j)+'*n'+str(i)+'*n'+str(j)+'/c'+str(i)
+                sys[j] +=' - A'+str(i)+'_'+str(j)+'*n'+str(j)+'*n'+str(i)+'/c'+str(j)
      
     for i in range(N):
         string_sys += sys[i] + '\n'          
@@ -7,6 +7,22 @@ Created on Sat Sep 26 14:24:50 2020
 """
 
 import LVsystem
+import glvEngine
+import jitEngine
+import integrationMethods
+import LVsolution
+import solutionPlot
+import parallelScan
+import binaryStorage
+import resultCache
+import systemDynamicGenerator
+import numpy as np
+import pytest
+import sys
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix
 
 def test_speciesCreation():
     """
@@ -31,8 +47,6 @@ def test_speciesCreation():
     assert sys.species_list == ['rabbit','fox']
     assert sys.intMatrix == {('rabbit','fox'):-1, ('fox','rabbit'):1}
 
-    sys.removeSpecies('rabbit')
-    sys.removeSpecies('fox')
 
 
 def test_speciesDestruction():    
@@ -110,9 +124,6 @@ def test_createData():
     assert data[6][1][2] == -data[6][2][1]
     assert data[6][2][2] == 0
     
-    sys.removeSpecies('rabbit')
-    sys.removeSpecies('fox')
-    sys.removeSpecies('hen')
 
 
 def test_loadData():
@@ -140,3 +151,920 @@ def test_loadData():
 
 
 
+def test_numpyBackend(tmp_path, monkeypatch):
+    """
+    Solves a known setup with both backends and checks that the in-memory 
+    integration agrees with the generated integrator.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    
+    sys.loadSetup('2Prey1Predator')
+    monkeypatch.chdir(tmp_path)
+    
+    sol = sys.solve(50, 65)
+    
+    assert sol.shape == (65, 3)
+    assert not (tmp_path / 'solution.csv').exists()
+    assert not (tmp_path / 'integrator.py').exists()
+    
+    legacy = sys.solve(50, 65, backend='codegen')
+    
+    assert np.allclose(sol.y, legacy.y, rtol=1e-5)
+    assert np.allclose(sol.t, legacy.t)
+    assert list(tmp_path.iterdir()) == []
+    
+
+
+def test_analyticJacobian():
+    """
+    Compares the analytic Jacobian, dense and banded, with a finite 
+    differences estimate.
+    """
+    
+    rng = np.random.default_rng(0)
+    N = 8
+    n = rng.uniform(1, 5, N)
+    k = rng.uniform(-1, 1, N)
+    c = rng.uniform(1, 10, N)
+    
+    # Tridiagonal interactions, so that the banded form is used. The
+    # negative diagonal keeps the populations bounded.
+    A = np.diag(rng.uniform(-1, 1, N-1), 1) - np.diag(rng.uniform(1, 2, N))
+    A_eff = glvEngine.effective_matrix(A)
+    
+    h = 1e-6
+    numeric = np.empty((N,N))
+    for j in range(N):
+        dn = np.zeros(N)
+        dn[j] = h
+        numeric[:,j] = ( glvEngine.rhs(n+dn, 0, k, c, A_eff) 
+                        -glvEngine.rhs(n-dn, 0, k, c, A_eff) )/(2*h)
+    
+    J = glvEngine.rhs_jacobian(n, 0, k, c, A_eff)
+    assert np.allclose(J, numeric, atol=1e-6)
+    
+    assert glvEngine.bandwidth(A_eff) == (1, 1)
+    band = glvEngine.BandedJacobian(A_eff, 1, 1)(n, 0, k, c, A_eff)
+    for i in range(N):
+        for j in range(max(i-1, 0), min(i+2, N)):
+            assert np.isclose(band[i-j+1][j], J[i][j])
+    
+    t = np.linspace(0, 10, 33)
+    sol = glvEngine.integrate(n, t, k, c, A)
+    assert np.allclose(sol, glvEngine.integrate(n, t, k, c, A, jacobian=False),
+                       rtol=1e-4)
+
+
+def test_solveEnsemble():
+    """
+    Solves a batch of perturbed setups at once and checks each member 
+    against a single solve with the same parameters.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    N, names, n0, k, K, c, A = sys.create_data()
+    
+    initial_conds = np.array([n0, [20,20,20], [40,5,10]])
+    growth_rates = np.array([k, k, [0.1,0.05,-0.08]])
+    
+    sols = sys.solve_ensemble(100, 33, initial_conds=initial_conds, 
+                              growth_rates=growth_rates)
+    
+    assert sols.shape == (3, 33, 3)
+    assert np.allclose(sols[0], sys.solve(100, 33).y, rtol=1e-4)
+
+    sys.setInitialCond('rabbit', 40)
+    sys.setInitialCond('hen', 5)
+    sys.setInitialCond('fox', 10)
+    sys.setGrowthRate('rabbit', 0.1)
+    sys.setGrowthRate('hen', 0.05)
+    sys.setGrowthRate('fox', -0.08)
+    assert np.allclose(sols[2], sys.solve(100, 33).y, rtol=1e-4)
+    
+
+
+def test_parallelScan():
+    """
+    Runs a small grid scan on two processes and checks order and results
+    against the serial scan and a direct solve.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    points = parallelScan.grid_points({('GrowthRate','rabbit'): [0.05, 0.09],
+                                       ('intMatrix',('hen','fox')): [-1, -2]})
+    
+    assert points[1] == {('GrowthRate','rabbit'): 0.05,
+                         ('intMatrix',('hen','fox')): -2}
+    
+    serial = list(sys.scan(points, 100, 33, processes=1))
+    parallel = list(sys.scan(points, 100, 33, processes=2))
+    
+    assert [r[0] for r in parallel] == [0, 1, 2, 3]
+    for r1, r2 in zip(serial, parallel):
+        assert r1[1] == r2[1]
+        assert np.allclose(r1[2].y, r2[2].y)
+    
+    sys.setInteraction('hen', 'fox', -2)
+    sys.setGrowthRate('rabbit', 0.05)
+    assert np.allclose(parallel[1][2].y, sys.solve(100, 33).y)
+    
+    assert len(parallelScan.random_points({('CarrCap','fox'): (1, 2)}, 5, 0)) == 5
+    
+
+
+def test_solutionObject(tmp_path):
+    """
+    Checks the in-memory solution returned by solve and its csv round trip.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('PreyPredator')
+    
+    sol = sys.solve(20, 129)
+    
+    assert isinstance(sol, LVsolution.Solution)
+    assert sys.solution is sol
+    assert sol.species == ['rabbit', 'fox']
+    assert sol.y.dtype == np.float64 and sol.y.flags['C_CONTIGUOUS']
+    assert np.array_equal(sol['fox'], sol.y[:,1])
+    assert sol.final_state()['rabbit'] == sol.y[-1,0]
+    
+    sol.to_csv(tmp_path / 'solution.csv')
+    read = LVsolution.Solution.from_csv(tmp_path / 'solution.csv', sol.t)
+    
+    assert read.species == sol.species
+    assert np.allclose(read.y, sol.y)
+    
+
+
+def test_sparseInteractions():
+    """
+    Builds a food chain without setting the missing interactions, and 
+    checks that they are zero and that the sparse integration agrees with
+    the dense one.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    names = ['s'+str(i) for i in range(12)]
+    for i, name in enumerate(names):
+        sys.addSpecies(name)
+        sys.setInitialCond(name, 1+i%3)
+        sys.setGrowthRate(name, 0.5 if i==0 else -0.1)
+        sys.setCarrCap(name, 100)
+        sys.setChangeRate(name, 10)
+    for i in range(11):
+        sys.setInteraction(names[i], names[i+1], -0.2)
+        sys.setInteraction(names[i+1], names[i], 0.2)
+    
+    A = sys.create_data()[6]
+    assert A[0][5] == 0 and A[0][1] == -0.2
+    
+    names, n0, k, K, c, A_sparse = sys.system_arrays(sparse=True)
+    assert A_sparse.format == 'csr'
+    assert np.array_equal(A_sparse.toarray(), A)
+    
+    A_eff = glvEngine.effective_matrix(A_sparse)
+    J = glvEngine.rhs_jacobian(n0, 0, k, c, A_eff)
+    assert np.allclose(J.toarray(), glvEngine.rhs_jacobian(n0, 0, k, c, A_eff.toarray()))
+    
+    dense = sys.solve(20, 33, sparse=False)
+    sparse = sys.solve(20, 33, sparse=True)
+    assert np.allclose(dense.y, sparse.y, rtol=1e-5)
+    assert np.allclose(sparse.y, sys.solve(20, 33, sparse=True, jacobian=False).y,
+                       rtol=1e-4)
+    
+
+
+def test_bulkLoading():
+    """
+    Loads a whole web at once and checks lookups, removals and the order 
+    of the species after the registry has been compacted.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    
+    N = 60
+    names = ['s'+str(i) for i in range(N)]
+    A = np.zeros((N,N))
+    for i in range(N-1):
+        A[i][i+1] = -0.5
+        A[i+1][i] = 0.5
+    
+    sys.add_species_many(names, initial_conds=np.ones(N), 
+                         growth_rates=np.full(N, 0.1), carr_caps=np.full(N, 10),
+                         change_rates=np.full(N, 2))
+    sys.set_interactions_from_array(A)
+    
+    assert sys.species_list == names
+    assert sys.intMatrix[('s3','s4')] == -0.5
+    assert len(sys.intMatrix) == 2*(N-1)
+    assert np.array_equal(sys.create_data()[6] - np.diag(np.diag(sys.create_data()[6])), A)
+    
+    # Removing most of the species triggers the compaction of the registry
+    for name in names[:50]:
+        sys.removeSpecies(name)
+    
+    assert sys.species_list == names[50:]
+    assert len(sys.intMatrix) == 2*(N-51)
+    assert sys.GrowthRate['s55'] == 0.1
+    assert sys.create_data()[6][0][1] == -0.5
+    
+
+
+def test_cachedArrays():
+    """
+    Checks that the assembled arrays are cached, patched in place by the
+    setters and rebuilt when the species change.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    names, n0, k, K, c, A = sys.system_arrays(sparse=True)
+    assert sys.system_arrays(sparse=True)[5] is A
+    
+    sys.setGrowthRate('hen', 0.14)
+    sys.setInteraction('rabbit', 'fox', -2)
+    assert sys.system_arrays(sparse=True)[5] is A
+    assert k[1] == 0.14
+    assert A[1,1] == 0.14*500/10000
+    assert A[0,2] == -2
+    
+    dense = sys.create_data()[6]
+    sys.setChangeRate('rabbit', 200)
+    assert sys.create_data()[6][0][0] == 0.09*200/10000
+    assert dense[0][0] == 0.09*400/10000
+    
+    sys.addSpecies('wolf')
+    sys.setInitialCond('wolf', 1)
+    sys.setGrowthRate('wolf', -0.1)
+    sys.setCarrCap('wolf', 1)
+    sys.setChangeRate('wolf', 100)
+    sys.setInteraction('wolf', 'rabbit', 0.5)
+    
+    assert sys.system_arrays(sparse=True)[5] is not A
+    assert sys.create_data()[6][3][0] == 0.5
+    
+
+
+def test_independentInstances():
+    """
+    Checks that two ecosystems do not share any state, and that they can
+    be solved concurrently from different threads.
+    """
+    
+    sys1 = LVsystem.Ecosystem()
+    sys2 = LVsystem.Ecosystem()
+    
+    sys1.loadSetup('2Prey1Predator')
+    sys2.loadSetup('PreyPredator')
+    
+    assert sys1.species_list == ['rabbit', 'hen', 'fox']
+    assert sys2.species_list == ['rabbit', 'fox']
+    
+    sys2.setGrowthRate('rabbit', 2)
+    assert sys1.GrowthRate['rabbit'] == 0.09
+    
+    with pytest.raises(AttributeError):
+        sys1.other = 0
+    
+    expected = [sys1.solve(100, 65).y, sys2.solve(5, 65).y]
+    
+    def run(i):
+        system = [sys1, sys2][i%2]
+        return system.solve([100, 5][i%2], 65).y
+    
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(run, range(8)))
+    
+    for i, y in enumerate(results):
+        assert np.allclose(y, expected[i%2])
+
+
+def test_benchmarkReport(tmp_path):
+    """
+    Runs the benchmark on a tiny system and checks the JSON report.
+    """
+    
+    sys.path.insert(0, 'benchmarks')
+    import benchmark_Solve
+    
+    output = str(tmp_path / 'bench.json')
+    benchmark_Solve.main(['--sizes', '2', '12', '--densities', '1', 
+                          '--repeats', '1', '--output', output])
+    
+    with open(output) as f:
+        report = json.load(f)
+    
+    stages = {(r['backend'], r['stage']) for r in report['results']}
+    assert ('numpy', 'integration') in stages
+    assert ('numpy-sparse', 'integration') in stages
+    assert ('codegen', 'compile') in stages
+    assert all(r['seconds'] >= 0 for r in report['results'] 
+               if not (r['stage'] == 'skipped'))
+    assert report['imports']['LVsystem']['heavy_modules'] == []
+
+
+def test_binaryStorage(tmp_path, monkeypatch):
+    """
+    Saves setups and solutions in binary and csv format, and checks that
+    they are read back correctly, with memory-mapped solutions.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    sol = sys.solve(100, 33)
+    
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'saved_setups').mkdir()
+    (tmp_path / 'saved_solutions').mkdir()
+    
+    sys.saveSetup('binary')
+    sys.saveSetup('text', format='csv')
+    sys.saveSolution('binary')
+    sys.saveSolution('text', format='csv')
+    
+    for name in ['binary', 'text']:
+        loaded = LVsystem.Ecosystem()
+        loaded.loadSetup(name)
+        for x, y in zip(loaded.create_data()[1:], sys.create_data()[1:]):
+            assert np.array_equal(x, y)
+    
+    assert binaryStorage.is_binary_setup('saved_setups/binary')
+    assert not binaryStorage.is_binary_setup('saved_setups/text')
+    
+    loaded = sys.loadSolution('binary')
+    assert isinstance(loaded.y.base, np.memmap)
+    assert np.array_equal(loaded.y, sol.y)
+    
+    window = loaded.select(['fox', 'rabbit'], 25, 50)
+    assert np.array_equal(window.t, sol.t[8:17])
+    assert np.array_equal(window.y, sol.y[8:17][:, [2, 0]])
+    
+    assert np.allclose(sys.loadSolution('text').y, sol.y)
+    
+    ensemble = sys.solve_ensemble(100, 33, growth_rates=[[0.09,0.07,-0.06],
+                                                         [0.1,0.1,-0.1]])
+    binaryStorage.save_ensemble('ensemble', sol.t, ensemble, sol.species)
+    stored = binaryStorage.Ensemble('ensemble')
+    
+    assert len(stored) == 2
+    assert np.array_equal(stored.member(1).y, ensemble[1])
+    t, y = stored.select(['hen'], t_max=50, members=[1])
+    assert y.shape == (1, 17, 1)
+    assert np.array_equal(y[0,:,0], ensemble[1,:17,1])
+
+
+
+
+def test_solveStream(tmp_path):
+    """
+    Integrates in chunks and checks that the chunks join into the same 
+    solution of solve, both in memory and in the store.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    sol = sys.solve(500, 1001)
+    
+    store = str(tmp_path / 'stream')
+    chunks = list(sys.solve_stream(500, 1001, chunk_steps=128, store=store))
+    
+    assert [len(chunk) for chunk in chunks] == [128]*7 + [105]
+    t = np.concatenate([chunk.t for chunk in chunks])
+    y = np.concatenate([chunk.y for chunk in chunks])
+    assert np.array_equal(t, sol.t)
+    assert np.allclose(y, sol.y, rtol=1e-5, atol=1e-6)
+    
+    stored = binaryStorage.open_solution(store)
+    assert np.array_equal(stored.y, y)
+    assert stored.species == sol.species
+
+
+def test_solveEvents():
+    """
+    Checks the times of the events against the analytic solutions: a 
+    lonely predator decays as n0*exp(k*t), a lonely prey blows up as 
+    K*n0*exp(k*t)/(K + n0 - n0*exp(k*t)).
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.add_species_many(['wolf', 'rabbit'], initial_conds=[10, 1], 
+                         growth_rates=[-0.5, 0.1], carr_caps=[1, 100], 
+                         change_rates=[1, 1])
+    
+    sol = sys.solve(100, 1001, extinction=1e-3, blow_up=1e4)
+    
+    assert np.isclose(sol.events['extinction']['wolf'], np.log(1e4)/0.5)
+    assert np.isclose(sol.events['blow_up'], np.log(1e4*101/(1e4+100))/0.1)
+    assert sol.t[-1] <= sol.events['blow_up'] < sol.t[-1] + 0.1
+    assert np.allclose(sol.y, sys.solve(sol.t[-1], len(sol)).y, rtol=1e-5)
+    
+    sol = sys.solve(100, 1001, extinction=1e-3, blow_up=1e4, 
+                    stop=('extinction',))
+    assert sol.t[-1] <= sol.events['extinction']['wolf'] < sol.t[-1] + 0.1
+    assert not ('blow_up' in sol.events)
+    
+    sol = sys.solve(46.1, 462, blow_up=1e4, stop=())
+    assert np.isclose(sol.events['blow_up'], np.log(1e4*101/(1e4+100))/0.1)
+    assert (len(sol) == 462) and (sol.y.max() > 1e4)
+    
+    # Past the singularity at t = log(101)/0.1 the run ends anyway
+    sol = sys.solve(60, 601, blow_up=1e4, stop=())
+    assert np.isclose(sol.events['blow_up'], np.log(1e4*101/(1e4+100))/0.1)
+    assert 46.1 <= sol.t[-1] <= np.log(101)/0.1
+    assert np.all(np.isfinite(sol.y))
+    
+    sys.removeSpecies('rabbit')
+    sol = sys.solve(100, 1001, steady_state=1e-4)
+    assert sol.events['steady_state'] >= np.log(5e4)/0.5
+    assert sol.t[-1] <= sol.events['steady_state'] < 100
+    
+    with pytest.raises(ValueError):
+        sys.solve(100, 1001, steady_state=1e-4, stop=('collapse',))
+
+
+def test_eventsAtStart():
+    """
+    Starts at an equilibrium, above the blow-up threshold and below the
+    extinction threshold: the integration stops at time 0, without any
+    step of the solver.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.add_species_many(['wolf'], initial_conds=[0], growth_rates=[-0.5],
+                         carr_caps=[1], change_rates=[1])
+    
+    sol = sys.solve(10, 11, steady_state=1e-6)
+    assert (sol.events['steady_state'] == 0) and (len(sol) == 1)
+    assert sol.stats.steps == 0
+    
+    sys.setInitialCond('wolf', 1e5)
+    sol = sys.solve(10, 11, blow_up=1e4)
+    assert (sol.events['blow_up'] == 0) and (len(sol) == 1)
+    
+    sys.setInitialCond('wolf', 1e-4)
+    sol = sys.solve(10, 11, extinction=1e-3, stop=('extinction',))
+    assert (sol.events['extinction'] == {'wolf': 0}) and (len(sol) == 1)
+
+
+def test_pruneExtinct():
+    """
+    Removes the extinct species during the integration and checks that
+    the solution is the same of the full system, with zeros after the
+    extinction.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.add_species_many(['wolf', 'bear', 'fox'], initial_conds=[10, 5, 3],
+                         growth_rates=[-1.0, -0.2, -0.1], carr_caps=[1, 1, 1],
+                         change_rates=[1, 2, 3])
+    sys.setInteraction('wolf', 'bear', 0.5)
+    sys.setInteraction('bear', 'fox', 0.3)
+    sys.setInteraction('wolf', 'fox', -0.2)
+    
+    full = sys.solve(30, 301, extinction=1e-6)
+    pruned = sys.solve(30, 301, extinction=1e-6, prune=True, sparse=True)
+    
+    assert list(pruned.events['extinction']) == ['wolf']
+    assert np.isclose(pruned.events['extinction']['wolf'], 
+                      full.events['extinction']['wolf'])
+    assert np.allclose(pruned.y, full.y, atol=1e-5)
+    assert np.all(pruned.t[pruned['wolf'] == 0] > 
+                  pruned.events['extinction']['wolf'])
+    assert np.all(pruned['wolf'][pruned.t > 21] == 0)
+    
+    with pytest.raises(ValueError):
+        sys.solve(30, 301, prune=True)
+
+
+def test_equilibrium():
+    """
+    Checks that the fixed points computed directly are zeros of the right
+    hand side, with the eigenvalues of the analytic Jacobian, for single
+    systems, boundary subsets and batches.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    names, n0, k, K, c, A = sys.system_arrays()
+    A_eff = glvEngine.effective_matrix(A)
+    
+    eq = sys.equilibrium()
+    assert np.allclose(glvEngine.rhs(eq.n, 0, k, c, A_eff), 0)
+    assert not eq.feasible
+    J = glvEngine.dense_jacobian(eq.n, 0, k, c, A_eff)
+    assert np.allclose(np.sort_complex(np.linalg.eigvals(J)),
+                       np.sort_complex(sys.stability(eq)))
+    
+    found = sys.boundary_equilibria()
+    assert [e.alive for e in found] == [['rabbit', 'fox'], ['hen', 'fox']]
+    for e in found:
+        assert e.feasible
+        assert np.allclose(glvEngine.rhs(e.n, 0, k, c, A_eff), 0)
+    assert found[0].saturated and not found[1].saturated
+    assert np.isclose(found[0].invasion['hen'], 
+                      k[1] + (A_eff @ found[0].n)[1]/c[1])
+    assert np.array_equal(sys.equilibrium(['rabbit', 'fox']).n, found[0].n)
+    
+    # The solution oscillates around the saturated fixed point
+    sol = sys.solve(2000, 2001)
+    assert np.allclose(sol.y[-200:].mean(axis=0), found[0].n, rtol=0.05, 
+                       atol=0.5)
+    
+    rates = [[0.09, 0.07, -0.06], [0.1, 0.1, -0.1]]
+    n, feasible, eigenvalues = sys.equilibrium_ensemble(growth_rates=rates)
+    for i in range(2):
+        sys.setGrowthRate('rabbit', rates[i][0])
+        sys.setGrowthRate('hen', rates[i][1])
+        sys.setGrowthRate('fox', rates[i][2])
+        eq = sys.equilibrium()
+        assert np.allclose(n[i], eq.n)
+        assert np.allclose(eigenvalues[i], eq.eigenvalues)
+        assert feasible[i] == eq.feasible
+    
+    with pytest.raises(TypeError):
+        sys.equilibrium(['wolf'])
+
+
+def test_compiledSystemCache(tmp_path, monkeypatch):
+    """
+    Checks that the generated system is compiled once for each number of
+    species, and that the on-disk cache is reused.
+    """
+    
+    systemDynamicGenerator.compile_System.cache_clear()
+    monkeypatch.setattr(systemDynamicGenerator, 'cache_dir', None)
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    first = sys.solve(50, 65, backend='codegen')
+    sys.setGrowthRate('fox', -0.05)
+    second = sys.solve(80, 33, backend='codegen')
+    
+    info = systemDynamicGenerator.compile_System.cache_info()
+    assert info.misses == 1
+    assert 'compile' in first.stats.stages
+    assert np.allclose(second.y, sys.solve(80, 33).y, rtol=1e-5)
+    assert not np.allclose(first.y[-1], second.y[-1])
+    
+    systemDynamicGenerator.set_cache_dir(str(tmp_path / 'cache'))
+    systemDynamicGenerator.compile_System.cache_clear()
+    system = systemDynamicGenerator.compile_System(3)
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+    
+    systemDynamicGenerator.compile_System.cache_clear()
+    monkeypatch.setattr(systemDynamicGenerator, 'create_System', None)
+    loaded = systemDynamicGenerator.compile_System(3)
+    assert loaded.__code__.co_code == system.__code__.co_code
+    systemDynamicGenerator.compile_System.cache_clear()
+
+
+def test_numbaBackend():
+    """
+    Checks the kernels of the 'numba' backend, run as plain Python, 
+    against the vectorized ones, and the backend against 'numpy'. Without
+    Numba the backend falls back to 'numpy' with a warning.
+    """
+    
+    rng = np.random.default_rng(1)
+    N = 6
+    n = rng.uniform(1, 5, N)
+    k = rng.uniform(-1, 1, N)
+    c = rng.uniform(1, 10, N)
+    A_eff = glvEngine.effective_matrix(rng.uniform(-1, 1, (N,N)))
+    A_csr = csr_matrix(A_eff)
+    
+    dndt = glvEngine.rhs(n, 0, k, c, A_eff)
+    J = glvEngine.dense_jacobian(n, 0, k, c, A_eff)
+    csr = (A_csr.indptr, A_csr.indices, A_csr.data)
+    assert np.allclose(jitEngine.dense_rhs(n, 0, k, c, A_eff), dndt)
+    assert np.allclose(jitEngine.csr_rhs(n, 0, k, c, *csr), dndt)
+    assert np.allclose(jitEngine.dense_jac(n, 0, k, c, A_eff), J)
+    assert np.allclose(jitEngine.csr_jac(n, 0, k, c, *csr), J)
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    sol = sys.solve(50, 65)
+    
+    if jitEngine.AVAILABLE:
+        compiled = sys.solve(50, 65, backend='numba')
+    else:
+        with pytest.warns(UserWarning):
+            compiled = sys.solve(50, 65, backend='numba')
+    
+    assert np.allclose(compiled.y, sol.y, rtol=1e-5)
+    
+    with pytest.raises(ValueError):
+        sys.solve(50, 65, backend='numba', extinction=1e-3)
+
+
+def test_solveStats(caplog):
+    """
+    Checks the statistics attached to the solution and their JSON record
+    on the logger.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    with caplog.at_level('INFO', logger='glv.solve'):
+        sol = sys.solve(500, 1001)
+    
+    stats = sol.stats
+    assert list(stats.stages) == ['assembly', 'integration', 'result']
+    assert stats.total > 0
+    assert stats.nfev > stats.steps > 0
+    assert 0 < stats.step_size['min'] <= stats.step_size['max']
+    assert sum(stats.methods.values()) <= 1000
+    
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record == json.loads(json.dumps(stats.to_dict()))
+    
+    # A single time: odeint takes no step and returns empty counters
+    for backend in ('numpy', 'codegen'):
+        sol = sys.solve(10, 1, backend=backend)
+        assert (len(sol) == 1) and (sol.stats.steps == 0)
+    
+    stiff = LVsystem.Ecosystem()
+    stiff.add_species_many(['fast', 'slow'], initial_conds=[1, 1], 
+                           growth_rates=[-1e3, -1], carr_caps=[1, 1],
+                           change_rates=[1, 1])
+    stats = stiff.solve(10, 1001).stats
+    assert (stats.methods['bdf'] > stats.methods['adams']) 
+    assert stats.njev > 0
+    assert (stats.switches[0][0] < 0.1) and (stats.switches[0][1] == 'bdf')
+    
+    stats = stiff.solve(10, 1001, extinction=1e-6, prune=True).stats
+    assert (stats.steps > 0) and (stats.nfev > 0)
+    assert stats.extra['restarts'] == 1
+
+
+def test_lazyImports():
+    """
+    Checks that importing the package and creating a system do not import
+    pandas, matplotlib and SciPy, that are imported on first use.
+    """
+    
+    code = ('import sys, LVsystem\n'
+            'eco = LVsystem.Ecosystem()\n'
+            'eco.add_species_many(["a", "b"], [1, 1], [1, -1], [10, 10], [1, 1])\n'
+            'eco.setInteraction("a", "b", -1)\n'
+            'print(",".join(m for m in ("pandas", "matplotlib", "scipy")'
+            ' if m in sys.modules))\n'
+            'eco.solve(1, 3)\n'
+            'print("scipy" in sys.modules, "pandas" in sys.modules)')
+    
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                            text=True, check=True).stdout.split('\n')
+    
+    assert output[0] == ''
+    assert output[1] == 'True False'
+
+
+def test_scalablePlot(tmp_path):
+    """
+    Checks that the decimation keeps the extremes of each curve, and that
+    a large solution is drawn as a single collection and saved headless.
+    """
+    
+    rng = np.random.default_rng(0)
+    T, N = 20001, 40
+    t = np.linspace(0, 100, T)
+    y = np.cumsum(rng.normal(size=(T, N)), axis=0)
+    y[12345, 7] = 1e4
+    
+    for method in ['minmax', 'lttb']:
+        tx, yx = solutionPlot.decimate(t, y, 500, method)
+        assert len(tx) <= 500
+        assert np.all(np.diff(tx, axis=0) >= 0)
+        assert yx[:, 7].max() == 1e4
+        assert np.array_equal(tx[[0, -1]], t[[0, -1]][:, None].repeat(N, 1))
+    
+    tx, yx = solutionPlot.decimate(t, y, 500)
+    assert np.array_equal(yx.max(axis=0), y.max(axis=0))
+    assert np.array_equal(yx.min(axis=0), y.min(axis=0))
+    
+    sol = LVsolution.Solution(t, y, ['s'+str(i) for i in range(N)])
+    path = tmp_path / 'plot.png'
+    fig, ax = sol.plot(str(path), top=3)
+    
+    assert path.stat().st_size > 0
+    assert len(ax.collections) == 1 and len(ax.lines) == 0
+    labels = [text.get_text() for text in ax.get_legend().get_texts()]
+    assert labels[0] == 's7' and labels[-1] == 'others' and len(labels) == 4
+    
+    fig, ax = sol.plot(str(path))
+    assert ax.get_legend() is None
+    assert len(ax.collections[0].get_segments()) == N
+
+
+def test_resumeSolve():
+    """
+    Continues a solution up to a later time and checks it against a 
+    single integration, then restarts it from a middle time with a new
+    parameter.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    full = sys.solve(200, 201)
+    first = sys.solve(100, 101)
+    resumed = sys.solve(200, 101, resume=first)
+    
+    assert np.array_equal(resumed.t, full.t)
+    assert np.array_equal(resumed.y[:101], first.y)
+    assert np.allclose(resumed.y, full.y, rtol=1e-5)
+    assert resumed.stats.steps < full.stats.steps
+    
+    sys.setGrowthRate('fox', -0.1)
+    changed = sys.solve(200, 151, resume=full, at=50.5)
+    
+    assert np.array_equal(changed.t[:51], full.t[:51])
+    assert np.array_equal(changed.y[:51], full.y[:51])
+    sys.setInitialCond('rabbit', full['rabbit'][50])
+    sys.setInitialCond('hen', full['hen'][50])
+    sys.setInitialCond('fox', full['fox'][50])
+    assert np.allclose(changed.y[50:], sys.solve(150, 151).y, rtol=1e-5)
+    
+    with pytest.raises(ValueError):
+        sys.solve(40, 11, resume=full, at=50)
+    sys.addSpecies('wolf')
+    with pytest.raises(ValueError):
+        sys.solve(300, 11, resume=full)
+
+
+def test_resultCache(tmp_path):
+    """
+    Solves the same system twice through a cache with a disk tier, checks
+    that the second solve is a hit and that a change of a parameter or of
+    an option misses. A new cache on the same directory finds the entry.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    cache = resultCache.ResultCache(directory=str(tmp_path))
+    
+    first = sys.solve(20, 65, cache=cache)
+    second = sys.solve(20, 65, cache=cache)
+    
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(first.y, second.y)
+    assert not second.y.flags.writeable
+    assert 'cache' in second.stats.stages
+    
+    sys.solve(20, 65, jacobian=False, cache=cache)
+    sys.setGrowthRate('fox', -0.1)
+    sys.solve(20, 65, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+    
+    dense = resultCache.system_key(*sys.system_arrays(False), first.t, {})
+    sparse = resultCache.system_key(*sys.system_arrays(True), first.t, {})
+    assert dense == sparse
+    
+    events = sys.solve(20, 65, extinction=1e-3, cache=cache)
+    disk = resultCache.ResultCache(directory=str(tmp_path), max_bytes=0)
+    sys.solve(20, 65, extinction=1e-3, cache=disk)
+    assert disk.hits == 1
+    assert np.array_equal(sys.solution.y, events.y)
+    assert sys.solution.events == events.events
+    
+    disk.put('other', first)
+    assert len([p for p in tmp_path.iterdir()]) == 0
+
+
+def test_integrationMethods():
+    """
+    Solves the same system with each method and checks them against the
+    default one, then checks the choice of 'auto' on a stiff and on a 
+    non-stiff system, and the evaluation at given times.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    reference = sys.solve(20, 129)
+    
+    for method in integrationMethods.METHODS:
+        solution = sys.solve(20, 129, method=method)
+        assert np.allclose(solution.y, reference.y, rtol=1e-5, atol=1e-8)
+        assert solution.stats.nfev > 0
+    
+    loose = sys.solve(20, 129, method='rk45', rtol=1e-3, atol=1e-6)
+    assert loose.stats.steps < sys.solve(20, 129, method='rk45').stats.steps
+    assert sys.solve(20, 129, max_step=0.05).stats.step_size['max'] < 0.051
+    
+    at = sys.solve(t_eval=[2.5, 10, 20])
+    assert np.array_equal(at.t, [0, 2.5, 10, 20])
+    assert np.allclose(at.y[[0, 2, 3]], reference.y[[0, 64, 128]], rtol=1e-5)
+    
+    N = integrationMethods.PROBE_MIN_SPECIES
+    k = -np.ones(N)
+    A = np.diag(np.ones(N - 1), 1)
+    t = np.linspace(0, 10, 11)
+    assert integrationMethods.choose_method(np.ones(N), t, k, np.ones(N),
+                                            A)[0] == 'dop853'
+    k[::2] = -1e3
+    method, stiffness = integrationMethods.choose_method(np.ones(N), t, k, 
+                                                         np.ones(N), A)
+    assert (method == 'lsoda') and (stiffness > 1e3)
+    
+    with pytest.raises(ValueError):
+        sys.solve(method='euler')
+    with pytest.raises(ValueError):
+        sys.solve(method='bdf', extinction=1e-3)
+    with pytest.raises(ValueError):
+        sys.solve(t_eval=[3, 2])
+
+
+def test_sensitivity():
+    """
+    Computes the sensitivities to a parameter of each kind and checks them
+    against finite differences of two solves.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    
+    parameters = [('GrowthRate', 'fox'), ('CarrCap', 'rabbit'), 
+                  ('ChangeRate', 'hen'), ('InitialCond', 'rabbit'),
+                  ('intMatrix', ('rabbit', 'fox')), 
+                  ('intMatrix', ('fox', 'rabbit'))]
+    sensitivity = sys.sensitivity(parameters, 10, 11)
+    
+    assert sensitivity.S.shape == (11, 3, 6)
+    assert np.allclose(sensitivity.solution.y, sys.solve(10, 11).y)
+    assert np.array_equal(sensitivity[('intMatrix', ('fox', 'rabbit'))], 
+                          np.zeros((11, 3)))
+    
+    setters = {'GrowthRate': sys.setGrowthRate, 'CarrCap': sys.setCarrCap,
+               'ChangeRate': sys.setChangeRate, 
+               'InitialCond': sys.setInitialCond}
+    for attribute, key in parameters[:5]:
+        if (attribute == 'intMatrix'):
+            value = sys.intMatrix[key]
+            setter = lambda v: sys.setInteraction(*key, v)
+        else:
+            value = getattr(sys, attribute)[key]
+            setter = lambda v: setters[attribute](key, v)
+        h = 1e-4*max(1, abs(value))
+        setter(value + h)
+        plus = sys.solve(10, 11).y
+        setter(value - h)
+        minus = sys.solve(10, 11).y
+        setter(value)
+        assert np.allclose(sensitivity[(attribute, key)], (plus - minus)/(2*h),
+                           rtol=1e-3, atol=1e-6)
+    
+    assert len(sys.sensitivity(max_time=1, t_steps=3).parameters) == 11
+    with pytest.raises(TypeError):
+        sys.sensitivity([('GrowthRate', 'wolf')])
+
+
+def test_fit():
+    """
+    Generates observations from the system, changes some parameters and
+    fits them back, with a sign constraint and two starts. Checks that the
+    system itself is changed only by FitResult.apply.
+    """
+    
+    sys = LVsystem.Ecosystem()
+    sys.loadSetup('2Prey1Predator')
+    true = sys.solve(60, 31)
+    observations = {'rabbit': true['rabbit'][1:].copy(), 
+                    'fox': true['fox'][1:].copy()}
+    observations['fox'][::4] = np.nan
+    
+    sys.setGrowthRate('rabbit', 0.05)
+    sys.setGrowthRate('fox', -0.1)
+    sys.setInteraction('rabbit', 'fox', -0.5)
+    free = [('GrowthRate', 'rabbit'), ('GrowthRate', 'fox'), 
+            ('intMatrix', ('rabbit', 'fox'))]
+    
+    result = sys.fit(true.t[1:], observations, free, signs='keep', starts=2,
+                     processes=1, seed=0)
+    
+    assert result.success and (len(result.starts) == 2)
+    assert np.allclose(list(result.parameters.values()), [0.09, -0.06, -1],
+                       rtol=1e-4)
+    assert result.dof == 30 + 22 - 3
+    assert all(error < 1e-3 for error in result.standard_errors.values())
+    assert np.allclose(result.correlation.diagonal(), 1)
+    assert (sys.GrowthRate['rabbit'] == 0.05)
+    
+    result.apply(sys)
+    assert np.allclose(sys.solve(60, 31).y, true.y, rtol=1e-4, atol=1e-6)
+    
+    bounded = sys.fit(true.t[1:], observations, free[:1], 
+                      bounds={free[0]: (0, 0.08)})
+    assert (bounded.active == free[:1])
+    with pytest.raises(ValueError):
+        sys.fit(true.t[1:], observations, free[2:], signs={free[2]: 1},
+                bounds={free[2]: (-2, 0)})
+    with pytest.raises(TypeError):
+        sys.fit(true.t[1:], {'wolf': true['fox'][1:]}, free)